@@ -0,0 +1,124 @@
+"""
+Shared parsing of access text ("交通") as written by the listing sites:
+
+    SUUMO:  "東京メトロ東西線/門前仲町駅 歩5分\nＪＲ京葉線/越中島駅 歩3分"
+            "東京メトロ有楽町線/豊洲駅 バス11分 (バス停)東陽一丁目 歩2分"
+    AtHome: "ＪＲ総武線 「亀戸」駅 徒歩4分"
+
+The same access strings repeat for every room of a building (and across runs),
+so parse results are memoized by the raw string.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class AccessRoute(NamedTuple):
+    line: str                   # "東京メトロ東西線" ("" if not given)
+    station: str                # "門前仲町" (without 駅)
+    walk_minutes: int           # on foot from the station, or from the bus stop for bus routes
+    bus_minutes: Optional[int]  # bus ride from the station, None if walking
+
+
+_ROUTE = re.compile(
+    r'(?:(?P<line>[^\n/「」]*?)\s*(?:/|「))?'
+    r'(?P<station>[^\n/「」\s]+?)」?駅\s*'
+    r'(?:バス\s*(?P<bus>\d+)分[^\n]*?)?'
+    r'徒?歩\s*(?P<walk>\d+)分'
+)
+# Station name without a walk time, e.g. a bare nearest_station value "門前仲町駅"
+_STATION_ONLY = re.compile(r'「?([^\s/「」]+?)」?駅')
+
+
+@lru_cache(maxsize=4096)
+def parse_access(access_text: str) -> Tuple[AccessRoute, ...]:
+    """Every (line, station, walk minutes, bus minutes) route in the text, in listed order."""
+    if not access_text:
+        return ()
+    return tuple(
+        AccessRoute(
+            line=(m.group("line") or "").strip(),
+            station=m.group("station"),
+            walk_minutes=int(m.group("walk")),
+            bus_minutes=int(m.group("bus")) if m.group("bus") else None,
+        )
+        for m in _ROUTE.finditer(access_text)
+    )
+
+
+def primary_route(access_text: str) -> Optional[AccessRoute]:
+    """The first walking route, or the first route at all if every route needs a bus."""
+    routes = parse_access(access_text)
+    for route in routes:
+        if route.bus_minutes is None:
+            return route
+    return routes[0] if routes else None
+
+
+@lru_cache(maxsize=4096)
+def first_station(access_text: str) -> str:
+    """"東京メトロ東西線/木場駅 歩5分" -> "木場駅"; also accepts a bare "木場駅"."""
+    if not access_text:
+        return ""
+    routes = parse_access(access_text)
+    if routes:
+        return routes[0].station + "駅"
+    match = _STATION_ONLY.search(access_text)
+    if match:
+        return match.group(1).split("/")[-1] + "駅"
+    return ""
+
+
+def station_walks(access_text: str) -> Dict[str, int]:
+    """
+    {"門前仲町駅": 5, "越中島駅": 3}: walking minutes to every station in the text
+    (the shortest if a station is listed twice). Bus routes are left out.
+    """
+    walks: Dict[str, int] = {}
+    for route in parse_access(access_text or ""):
+        if route.bus_minutes is None:
+            station = route.station + "駅"
+            walks[station] = min(walks.get(station, route.walk_minutes), route.walk_minutes)
+    return walks
+
+
+def format_station_walks(access_text: str) -> Optional[str]:
+    """Stored form of station_walks(): "門前仲町駅:5|越中島駅:3", None if there are none."""
+    walks = station_walks(access_text)
+    return "|".join(f"{station}:{minutes}" for station, minutes in walks.items()) or None
+
+
+def parse_station_walks(value: Optional[str]) -> Dict[str, int]:
+    """Inverse of format_station_walks()."""
+    walks = {}
+    for pair in (value or "").split("|"):
+        station, _, minutes = pair.rpartition(":")
+        if station and minutes.isdigit():
+            walks[station] = int(minutes)
+    return walks
+
+
+class StationMatcher:
+    """
+    Tests access text against a fixed set of stations with one precompiled alternation,
+    e.g. "(?:/|「|^|\\s)(門前仲町|月島|...)」?駅". Matches SUUMO ("/月島駅") and AtHome ("「月島」駅")
+    spellings alike, but not stations that merely end with a target name.
+    """
+
+    def __init__(self, stations: Iterable[str]):
+        names = {s.strip().removesuffix("駅") for s in stations if s and s.strip()}
+        self.stations = names
+        self._pattern = None
+        if names:
+            # Longest first so a prefix never shadows a longer name
+            alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+            self._pattern = re.compile(rf'(?:^|[/「\s])(?:{alternation})」?駅')
+
+    def matches(self, access_text: str) -> bool:
+        if self._pattern is None or not access_text:
+            return False
+        return self._pattern.search(access_text) is not None
+
+    def matched_stations(self, access_text: str) -> List[str]:
+        """Target stations reachable per the access text, in listed order."""
+        return [r.station for r in parse_access(access_text) if r.station in self.stations]
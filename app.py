@@ -1,24 +1,107 @@
-from flask import Flask, render_template, jsonify
-from csv_manager import CSVManager
+from flask import Flask, render_template, jsonify, request
+import config
+from config import PAGE_COLUMNS, SEARCH_CONDITIONS, SEARCH_CONDITIONS_PATH
+from buildings import group_buildings
+from commute_index import for_store, parse_clauses
+from dedup import merge_records
+from listing_history import ListingHistory
+from search_profiles import ProfileFilter, load_profiles
+from store_reader import read_properties
+from text_index import FIELDS, load_or_build, page_postings, page_texts
 import logging
+import os
 
 app = Flask(__name__)
-csv_manager = CSVManager()
+# Read-only: the plain csv reader is enough, so the app doesn't load pandas
+STORE_PATH = "properties.csv"
+history = (ListingHistory(os.path.join(os.path.dirname(os.path.abspath(STORE_PATH)), config.HISTORY_DIR_NAME))
+           if config.HISTORY_ENABLED else None)
 
 # Disable Flask logging to keep console clean
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
 
+def _page_records(name):
+    """Page records of every listing, or of one search profile's listings, and its priority stations."""
+    profiles = load_profiles(SEARCH_CONDITIONS_PATH, SEARCH_CONDITIONS)
+    if name not in profiles:
+        return read_properties(STORE_PATH, columns=PAGE_COLUMNS), []
+    # The profile filter needs the access text, which the page itself doesn't
+    profile_filter = ProfileFilter(profiles[name])
+    records = profile_filter.filter(read_properties(STORE_PATH, columns=PAGE_COLUMNS + ['access', 'building_age']))
+    for r in records:
+        del r['access'], r['building_age']
+    return records, profiles[name].get('stations', [])
+
 @app.route('/')
 def index():
-    properties = csv_manager.get_all_properties()
-    return render_template('index.html', properties=properties)
+    """All listings, or one search profile's with /?profile=name"""
+    records, priority_stations = _page_records(request.args.get('profile'))
+    groups = group_buildings(merge_records(records))
+    search_index = page_postings(load_or_build(STORE_PATH), groups)
+    search_texts = page_texts(groups, {r['url']: r for r in read_properties(STORE_PATH, columns=list(FIELDS))})
+    return render_template('index.html', groups=groups, priority_stations=priority_stations,
+                           search_index=search_index, search_texts=search_texts)
+
+@app.route('/api/buildings')
+def get_buildings():
+    """Listings grouped by building with precomputed aggregates: /api/buildings?profile=name"""
+    records, _ = _page_records(request.args.get('profile'))
+    return jsonify(group_buildings(merge_records(records)))
+
+@app.route('/api/search')
+def search():
+    """Listings whose title, address, access or layout contain every word: /api/search?q=門前仲町 2LDK&profile=name"""
+    query = request.args.get('q', '')
+    profile = request.args.get('profile')
+    records = read_properties(STORE_PATH)
+    if profile:
+        profiles = load_profiles(SEARCH_CONDITIONS_PATH, SEARCH_CONDITIONS)
+        if profile in profiles:
+            records = ProfileFilter(profiles[profile]).filter(records)
+    by_url = {r['url']: r for r in records}
+    urls = load_or_build(STORE_PATH).search(query, by_url) or []
+    return jsonify([by_url[url] for url in urls])
+
+@app.route('/api/commute')
+def commute():
+    """Listings within walking minutes of any of the stations: /api/commute?near=門前仲町:7,月島:5&profile=name"""
+    try:
+        clauses = parse_clauses(request.args.get('near', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    commutes = for_store(STORE_PATH).query(clauses)
+    records = [r for r in read_properties(STORE_PATH) if r['url'] in commutes]
+    profile = request.args.get('profile')
+    if profile:
+        profiles = load_profiles(SEARCH_CONDITIONS_PATH, SEARCH_CONDITIONS)
+        if profile in profiles:
+            records = ProfileFilter(profiles[profile]).filter(records)
+    for r in records:
+        r['commute'] = commutes[r['url']]._asdict()
+    return jsonify(sorted(records, key=lambda r: r['commute']['minutes']))
 
 @app.route('/api/properties')
 def get_properties():
-    properties = csv_manager.get_all_properties()
+    properties = read_properties(STORE_PATH)
     return jsonify(properties)
 
+@app.route('/api/history')
+def get_history():
+    """Price history of one listing: /api/history?url=..."""
+    url = request.args.get('url')
+    if not url or history is None:
+        return jsonify([])
+    return jsonify(history.price_history(url))
+
+@app.route('/api/snapshot')
+def get_snapshot():
+    """Status and prices of every listing as of a time: /api/snapshot?as_of=2026-09-01"""
+    as_of = request.args.get('as_of')
+    if not as_of or history is None:
+        return jsonify({})
+    return jsonify(history.state_as_of(as_of))
+
 if __name__ == '__main__':
     print("Starting Web Server at http://localhost:8081")
     app.run(debug=True, host='0.0.0.0', port=8081)
@@ -0,0 +1,311 @@
+"""
+Benchmark suite for the scrape pipeline.
+
+    python -m benchmarks.bench_pipeline                           # 1k and 10k listings
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000
+    python -m benchmarks.bench_pipeline --archive scrape_archive.jsonl.gz   # use recorded pages
+    python -m benchmarks.bench_pipeline --save-baseline           # store results as the baseline
+    PARSE_WORKERS=4 python -m benchmarks.bench_pipeline --only suumo.parse_html suumo.parse_pool
+
+Each benchmark reports median wall time, throughput (listings/s), peak traced memory
+and output size, and is compared against benchmarks/baseline.json when it exists.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fixtures
+from csv_manager import CSVManager
+from scrape_state import ScrapeState
+from scrapers.suumo_scraper import SuumoScraper
+from scrapers.athome_scraper import AtHomeScraper
+from scrapers.parse_pool import parse_pool
+from utils import extract_station_name
+from store_reader import read_properties
+import pipeline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> setup(size, ctx) returning a run() callable that yields (items, output_bytes)
+BENCHMARKS: Dict[str, Callable[[int, "Context"], Callable[[], Tuple[int, int]]]] = {}
+
+
+def benchmark(name: str):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class Context:
+    """Fixtures shared across benchmarks, built once per size."""
+
+    def __init__(self, workdir: str, archive_path: str = None):
+        self.workdir = workdir
+        recorded = fixtures.load_recorded_pages(archive_path)
+        self.suumo_pages = recorded["suumo"] or [fixtures.make_suumo_page(seed=i) for i in range(4)]
+        self.athome_pages = recorded["athome"] or [fixtures.make_athome_page(seed=i) for i in range(4)]
+        self.recorded = bool(recorded["suumo"] or recorded["athome"])
+        self._stores: Dict[int, str] = {}
+
+    def store(self, size: int) -> str:
+        """A CSV store with `size` listings, written once and reused."""
+        if size not in self._stores:
+            path = os.path.join(self.workdir, f"store_{size}.csv")
+            CSVManager(path).save_properties(fixtures.make_properties(size, seed=1))
+            self._stores[size] = path
+        return self._stores[size]
+
+
+def _parse_until(parse: Callable[[str], List[Any]], pages: List[str], size: int) -> int:
+    parsed = 0
+    i = 0
+    while parsed < size:
+        count = len(parse(pages[i % len(pages)]))
+        if count == 0 and i >= len(pages):
+            break  # Recorded pages with nothing parseable; avoid spinning forever
+        parsed += count
+        i += 1
+    return parsed
+
+
+@benchmark("suumo.parse_html")
+def bench_suumo_parse(size: int, ctx: Context):
+    scraper = SuumoScraper()
+    return lambda: (_parse_until(scraper.parse_html, ctx.suumo_pages, size), 0)
+
+
+@benchmark("suumo.parse_pool")
+def bench_suumo_parse_pool(size: int, ctx: Context):
+    # The same pages through the process pool, all submitted at once (PARSE_WORKERS workers)
+    scraper = SuumoScraper()
+    per_page = len(scraper.parse_html(ctx.suumo_pages[0])) or 1
+    pages = [ctx.suumo_pages[i % len(ctx.suumo_pages)] for i in range(max(1, size // per_page))]
+
+    async def parse_all():
+        return sum(len(properties) for properties in
+                   await asyncio.gather(*(parse_pool.parse(scraper, html) for html in pages)))
+
+    # Workers start outside the timed runs
+    asyncio.run(parse_all())
+    return lambda: (asyncio.run(parse_all()), 0)
+
+
+@benchmark("athome.parse_html")
+def bench_athome_parse(size: int, ctx: Context):
+    scraper = AtHomeScraper()
+    return lambda: (_parse_until(scraper.parse_html, ctx.athome_pages, size), 0)
+
+
+class _FixtureSuumo(SuumoScraper):
+    """SuumoScraper that serves `count` result pages from the fixtures instead of fetching."""
+
+    # Defaults: parse_pool workers construct scrapers without arguments
+    def __init__(self, pages: List[str] = (), count: int = 0):
+        super().__init__()
+        self._pages = pages
+        self._count = count
+
+    async def fetch_page_async(self, url: str) -> str:
+        n = int(url.rsplit("pn=", 1)[1])
+        return self._pages[(n - 1) % len(self._pages)] if n <= self._count else ""
+
+
+@benchmark("pipeline.search_source")
+def bench_search_source(size: int, ctx: Context):
+    # A wide search where the station filter keeps few listings: peak memory should
+    # not grow with the number of pages
+    per_page = len(SuumoScraper().parse_html(ctx.suumo_pages[0])) or 1
+    pages = max(1, size // per_page)
+    state_path = os.path.join(ctx.workdir, "bench_state.json")
+    conditions = {"stations": ["月島駅"]}
+
+    def run():
+        scraper = _FixtureSuumo(ctx.suumo_pages, pages)
+        asyncio.run(pipeline.search_source(scraper, conditions, None, ScrapeState(state_path), True, set()))
+        return pages * per_page, 0
+    return run
+
+
+@benchmark("csv.save_properties")
+def bench_csv_merge(size: int, ctx: Context):
+    base = ctx.store(size)
+    target = os.path.join(ctx.workdir, "merge.csv")
+    # Half of the batch overlaps existing rows (updates), half is new (inserts)
+    batch = fixtures.make_properties(size, seed=2, url_offset=size // 2)
+
+    def run():
+        shutil.copyfile(base, target)
+        CSVManager(target).save_properties(batch)
+        return len(batch), os.path.getsize(target)
+    return run
+
+
+@benchmark("csv.get_all_properties")
+def bench_csv_read(size: int, ctx: Context):
+    manager = CSVManager(ctx.store(size))
+    return lambda: (len(manager.get_all_properties()), 0)
+
+
+@benchmark("store_reader.read_properties")
+def bench_store_read(size: int, ctx: Context):
+    path = ctx.store(size)
+    return lambda: (len(read_properties(path)), 0)
+
+
+@benchmark("utils.extract_station_name")
+def bench_extract_station(size: int, ctx: Context):
+    access_texts = [p["access"] for p in fixtures.make_properties(size, seed=3)]
+
+    def run():
+        for text in access_texts:
+            extract_station_name(text)
+        return len(access_texts), 0
+    return run
+
+
+@benchmark("pipeline.generate_html")
+def bench_generate_html(size: int, ctx: Context):
+    manager = CSVManager(ctx.store(size))
+    output = os.path.join(ctx.workdir, "index.html")
+
+    def run():
+        pipeline.generate_html(manager, output_path=output)
+        return size, os.path.getsize(output)
+    return run
+
+
+def measure(run: Callable[[], Tuple[int, int]], repeat: int, memory: bool) -> Dict[str, Any]:
+    times = []
+    items = output_bytes = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        items, output_bytes = run()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        # Separate pass: tracemalloc distorts timings
+        gc.collect()
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    seconds = statistics.median(times)
+    return {
+        "seconds": round(seconds, 6),
+        "items": items,
+        "throughput": round(items / seconds, 1) if seconds > 0 else None,
+        "peak_memory_bytes": peak,
+        "output_bytes": output_bytes,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("seconds", "peak_memory_bytes"):
+            new, old = result.get(metric), base.get(metric)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            result[f"{metric}_change"] = round(change, 3)
+            if change > threshold:
+                regressions.append(f"{key} {metric}: {old} -> {new} (+{change:.0%})")
+    return regressions
+
+
+def _format_bytes(value) -> str:
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.0f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TB"
+
+
+def print_table(results: Dict[str, Dict[str, Any]]):
+    print(f"{'benchmark':<40} {'time':>10} {'items/s':>12} {'peak mem':>10} {'output':>10} {'vs base':>8}")
+    for key, r in results.items():
+        change = r.get("seconds_change")
+        change_str = f"{change:+.0%}" if change is not None else "-"
+        print(f"{key:<40} {r['seconds']:>9.3f}s {r['throughput'] or 0:>12,.0f} "
+              f"{_format_bytes(r['peak_memory_bytes']):>10} {_format_bytes(r['output_bytes']):>10} {change_str:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper parsing, CSV merge and page generation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Listing counts to benchmark")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per benchmark (median is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass")
+    parser.add_argument("--archive", help="Use list pages from a --record archive instead of synthetic ones")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument("--output", help="Also write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    names = args.only or list(BENCHMARKS)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="tintai-bench-")
+    try:
+        # Scrapers drop debug HTML into the working directory
+        os.chdir(workdir)
+        ctx = Context(workdir, archive_path=os.path.join(cwd, args.archive) if args.archive else None)
+        if ctx.recorded:
+            print("Using recorded pages from archive")
+        for size in args.sizes:
+            for name in names:
+                run = BENCHMARKS[name](size, ctx)
+                results[f"{name}@{size}"] = measure(run, args.repeat, memory=not args.no_memory)
+    finally:
+        parse_pool.close()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
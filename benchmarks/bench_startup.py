@@ -0,0 +1,95 @@
+"""
+Startup-time benchmark for the read-only entry points.
+
+    python -m benchmarks.bench_startup                 # --help, --show and the web app import
+    python -m benchmarks.bench_startup --budget 0.2 --repeat 10
+
+Each command runs in a fresh interpreter. The reported time is the median wall time
+minus the interpreter's own startup (`python -c pass`), so it measures what our code
+adds. The slowest top-level imports come from `python -X importtime`. Exits with 1 if
+a CLI command goes over the budget or any command loads one of the heavy scraping modules.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (interpreter arguments, held to the time budget). The web app is only checked
+# for heavy modules: importing Flask alone takes about as long as the budget.
+COMMANDS: Dict[str, Tuple[List[str], bool]] = {
+    "main.py --help": (["main.py", "--help"], True),
+    "main.py --show": (["main.py", "--show"], True),
+    "import app": (["-c", "import app"], False),
+}
+# Modules the read-only commands must not import
+HEAVY_MODULES = ["pandas", "playwright", "bs4", "googlemaps", "pyarrow"]
+
+
+def wall_time(args: List[str], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_profile(args: List[str]) -> List[Tuple[str, int]]:
+    """(module, cumulative µs) for every module the command imports, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit():
+            # One space after the bar, then two per nesting level
+            modules.append((name[1:].rstrip(), int(cumulative)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup time of the read-only commands")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command (median is reported)")
+    parser.add_argument("--budget", type=float, default=0.2, help="Allowed seconds on top of interpreter startup")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports to list per command")
+    args = parser.parse_args()
+
+    interpreter = wall_time(["-c", "pass"], args.repeat)
+    # Imported by the interpreter itself (site, encodings, ...), not by our code
+    preloaded = {m for m, _ in import_profile(["-c", "pass"])}
+    print(f"interpreter startup: {interpreter * 1000:.0f}ms (subtracted below)\n")
+
+    failures = []
+    for name, (command, budgeted) in COMMANDS.items():
+        seconds = wall_time(command, args.repeat) - interpreter
+        modules = import_profile(command)
+        # Top-level imports are the unindented names
+        top_level = sorted(((m, us) for m, us in modules if not m.startswith(" ") and m not in preloaded),
+                           key=lambda x: -x[1])
+        loaded = {m.strip().split(".")[0] for m, _ in modules}
+        heavy = [m for m in HEAVY_MODULES if m in loaded]
+
+        over_budget = budgeted and seconds > args.budget
+        status = "FAIL" if over_budget or heavy else "ok"
+        print(f"{name:<20} {seconds * 1000:>7.0f}ms  {status}")
+        for module, us in top_level[:args.top]:
+            print(f"    {module:<30} {us / 1000:>7.1f}ms")
+        if heavy:
+            print(f"    loads heavy modules: {', '.join(heavy)}")
+        if status == "FAIL":
+            failures.append(name)
+
+    if failures:
+        print(f"\nOver the {args.budget * 1000:.0f}ms budget or loading heavy modules: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
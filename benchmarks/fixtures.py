@@ -0,0 +1,151 @@
+"""
+Synthetic and recorded fixtures for the benchmark suite.
+Synthetic pages mimic the list-page markup the scrapers expect, so parse
+benchmarks exercise the same selectors as production.
+"""
+import gzip
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+STATIONS = ["門前仲町", "月島", "豊洲", "清澄白河", "新富町", "越中島", "木場", "東陽町", "勝どき", "八丁堀"]
+LINES = ["東京メトロ東西線", "東京メトロ有楽町線", "都営大江戸線", "ＪＲ京葉線", "東京メトロ日比谷線"]
+LAYOUTS = ["1K", "1DK", "1LDK", "2K", "2DK", "2LDK"]
+WARDS = ["東京都江東区", "東京都中央区"]
+TOWNS = ["古石場", "東陽", "豊洲", "月島", "勝どき", "新川", "白河", "牡丹"]
+
+
+def _rng(seed: int) -> random.Random:
+    return random.Random(seed)
+
+
+def make_access(rng: random.Random, lines: int = 3) -> str:
+    parts = []
+    for _ in range(lines):
+        parts.append(f"{rng.choice(LINES)}/{rng.choice(STATIONS)}駅 歩{rng.randint(1, 15)}分")
+    return "\n".join(parts)
+
+
+def make_athome_access(rng: random.Random) -> str:
+    return f"{rng.choice(LINES)} 「{rng.choice(STATIONS)}」駅 徒歩{rng.randint(1, 15)}分"
+
+
+def make_properties(count: int, seed: int = 0, url_offset: int = 0) -> List[Dict[str, Any]]:
+    """Property dicts shaped like scraper output, with unique URLs."""
+    rng = _rng(seed)
+    properties = []
+    building = None
+    for i in range(count):
+        # Roughly four rooms per building, like SUUMO cassettes
+        if building is None or i % 4 == 0:
+            station = rng.choice(STATIONS)
+            building = {
+                "title": f"グランドメゾン{station}{i // 4}",
+                "address": f"{rng.choice(WARDS)}{rng.choice(TOWNS)}{rng.randint(1, 6)}",
+                "access": make_access(rng),
+                "nearest_station": f"{station}駅",
+                "walk_minutes": rng.randint(1, 15),
+            }
+        rent = round(rng.uniform(8.0, 16.0), 1)
+        admin_fee = rng.choice([0.0, 0.5, 0.8, 1.0, 1.2])
+        prop = dict(building)
+        prop.update({
+            "price": rent,
+            "admin_fee": admin_fee,
+            "total_price": rent + admin_fee,
+            "layout": rng.choice(LAYOUTS),
+            "area": round(rng.uniform(20.0, 45.0), 2),
+            "walking_distance_actual": rng.choice([None, float(rng.randint(1, 15))]),
+            "url": f"https://suumo.jp/chintai/jnc_{url_offset + i:012d}/",
+            "source": "SUUMO",
+            "status": "active",
+        })
+        properties.append(prop)
+    return properties
+
+
+def make_suumo_page(buildings: int = 50, rooms_per_building: int = 4, seed: int = 0) -> str:
+    """A SUUMO result page (FR301FC001) with the cassette markup parse_html reads."""
+    rng = _rng(seed)
+    cassettes = []
+    for b in range(buildings):
+        rows = []
+        for r in range(rooms_per_building):
+            rent = round(rng.uniform(8.0, 16.0), 1)
+            admin = rng.choice(["-", "5000円", "10000円", "12000円"])
+            rows.append(f"""
+        <tbody><tr class="js-cassette_link">
+          <td></td><td></td><td>{r + 1}階</td>
+          <td><ul><li><span class="cassetteitem_price cassetteitem_price--rent"><span class="cassetteitem_other-emphasis ui-text--bold">{rent}万円</span></span></li>
+          <li><span class="cassetteitem_price cassetteitem_price--administration">{admin}</span></li></ul></td>
+          <td></td>
+          <td><ul><li><span class="cassetteitem_madori">{rng.choice(LAYOUTS)}</span></li>
+          <li><span class="cassetteitem_menseki">{round(rng.uniform(20.0, 45.0), 2)}m<sup>2</sup></span></li></ul></td>
+          <td></td><td></td>
+          <td><a class="js-cassette_link_href cassetteitem_other-linktext" href="/chintai/jnc_{seed:04d}{b:04d}{r:04d}/?bc=100">詳細を見る</a></td>
+        </tr></tbody>""")
+        access_lines = "\n".join(
+            f'<div class="cassetteitem_detail-text">{rng.choice(LINES)}/{rng.choice(STATIONS)}駅 歩{rng.randint(1, 15)}分</div>'
+            for _ in range(3)
+        )
+        cassettes.append(f"""
+  <div class="cassetteitem">
+    <div class="cassetteitem-detail">
+      <div class="cassetteitem-detail-object"><div class="cassetteitem_content-title">パークハビオ{rng.choice(STATIONS)}{b}</div></div>
+      <ul class="cassetteitem_detail">
+        <li class="cassetteitem_detail-col1">{rng.choice(WARDS)}{rng.choice(TOWNS)}{rng.randint(1, 6)}</li>
+        <li class="cassetteitem_detail-col2">{access_lines}</li>
+        <li class="cassetteitem_detail-col3"><div>築{rng.randint(1, 30)}年</div><div>{rng.randint(3, 20)}階建</div></li>
+      </ul>
+    </div>
+    <div class="cassetteitem-item"><table class="cassetteitem_other">{"".join(rows)}</table></div>
+  </div>""")
+    return f"<html><head><title>SUUMO</title></head><body><div id=\"js-bukkenList\">{''.join(cassettes)}</div></body></html>"
+
+
+def make_athome_page(buildings: int = 30, rooms_per_building: int = 3, seed: int = 0) -> str:
+    """An at home list page with the .p-property markup parse_html reads."""
+    rng = _rng(seed)
+    blocks = []
+    for b in range(buildings):
+        rooms = []
+        for r in range(rooms_per_building):
+            rent = round(rng.uniform(8.0, 16.0), 1)
+            rooms.append(f"""
+        <div class="p-property__room--detail-information">
+          <span class="p-property__room-rent">{rent}万円</span>
+          <div class="p-property__information-price"><span>{rng.choice(["5,000円", "10,000円", "-"])}</span></div>
+          <span class="p-property__floor">{rng.choice(LAYOUTS)}</span>
+          <span>{round(rng.uniform(20.0, 45.0), 2)}m²</span>
+          <div class="p-property__room-more-link"><a href="/chintai/{seed:04d}{b:04d}{r:04d}/">詳細</a></div>
+        </div>""")
+        blocks.append(f"""
+  <div class="p-property">
+    <h2 class="p-property__title--building">アトラス{rng.choice(STATIONS)}{b}</h2>
+    <dl class="p-property__information-hint"><dt>交通</dt><dd>{make_athome_access(rng)}</dd></dl>
+    {"".join(rooms)}
+  </div>""")
+    return f"<html><body>{''.join(blocks)}</body></html>"
+
+
+def load_recorded_pages(archive_path: str) -> Dict[str, List[str]]:
+    """
+    Pulls list pages out of a --record archive so benchmarks can run against real markup.
+    Returns {"suumo": [...], "athome": [...]} (either may be empty).
+    """
+    pages = {"suumo": [], "athome": []}
+    if not archive_path or not os.path.exists(archive_path):
+        return pages
+    with gzip.open(archive_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = entry["key"]
+            value = entry["value"]
+            if key.startswith("http:") and "FR301FC001" in key:
+                pages["suumo"].append(value["text"])
+            elif key.startswith("browser:") and "athome.co.jp" in key:
+                pages["athome"].append(value)
+    return pages
@@ -0,0 +1,72 @@
+"""
+Building groups for the listing page: rooms grouped by building with the card's
+aggregates (price/area ranges, walks, stations, sources, latest update) precomputed,
+so the page doesn't have to regroup every row on load and on each filter change.
+"""
+import hashlib
+from typing import Any, Dict, List
+
+from dedup import normalize_name
+
+# Fields shared by the building; left out of the nested rooms
+BUILDING_FIELDS = ("title", "address")
+# Stands in for an unknown walk, as on the page
+NO_WALK = 99
+
+
+def building_id(title: str) -> str:
+    """Stable id of a building across runs and sources (width/space/alias variants of a name agree)."""
+    key = normalize_name(title) or "unknown"
+    return "b" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _filter_walk(room: Dict[str, Any]) -> float:
+    """The walk the page filters on: the real walking time if known, else the stated one."""
+    return room.get("walking_distance_actual") or room.get("walk_minutes") or NO_WALK
+
+
+def aggregate(rooms: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Card aggregates of a set of rooms (the page recomputes these for partly filtered groups)."""
+    prices = [r.get("total_price") or r.get("price") or 0 for r in rooms]
+    areas = [r.get("area") or 0 for r in rooms]
+    filter_walks = [_filter_walk(r) for r in rooms]
+    stations = list(dict.fromkeys(r["nearest_station"] for r in rooms if r.get("nearest_station")))
+    sources = list(dict.fromkeys(
+        s.get("source") or "Unknown"
+        for r in rooms for s in (r.get("sources") or [{"source": r.get("source")}])
+    ))
+    return {
+        "min_price": min(prices),
+        "max_price": max(prices),
+        "min_area": min(areas),
+        "max_area": max(areas),
+        "min_walk": min(r.get("walk_minutes") or NO_WALK for r in rooms),
+        "min_real_walk": min(r.get("walking_distance_actual") or NO_WALK for r in rooms),
+        "min_filter_walk": min(filter_walks),
+        "max_filter_walk": max(filter_walks),
+        "latest_update": max(r.get("last_updated") or "" for r in rooms),
+        "active_count": sum(1 for r in rooms if r.get("status") != "ended"),
+        "stations": stations,
+        # A room without a station never passes a station filter
+        "unknown_station": any(not r.get("nearest_station") for r in rooms),
+        "sources": sources,
+    }
+
+
+def group_buildings(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    [{id, title, address, rooms: [...], **aggregate(rooms)}] in order of first appearance.
+    Takes page records (see dedup.merge_records).
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for r in records:
+        title = r.get("title") or "Unknown"
+        gid = building_id(title)
+        group = groups.get(gid)
+        if group is None:
+            group = groups[gid] = {"id": gid, "title": title, "address": r.get("address") or "-", "rooms": []}
+        group["rooms"].append({k: v for k, v in r.items() if k not in BUILDING_FIELDS})
+
+    for group in groups.values():
+        group.update(aggregate(group["rooms"]))
+    return list(groups.values())
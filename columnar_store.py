@@ -0,0 +1,60 @@
+"""
+Arrow IPC storage for the property store.
+
+The CSV stays the committed artifact; this is a columnar sidecar (properties.arrow)
+that can be memory-mapped and read column by column. String columns are
+dictionary-encoded, which suits this data: building-level fields repeat for
+every room and status/source/station/layout have a handful of distinct values.
+pyarrow is optional; callers check available() and fall back to the CSV.
+"""
+import logging
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def write_arrow(df: pd.DataFrame, path: str, dictionary_columns: List[str]):
+    """Writes df as an Arrow IPC file, dictionary-encoding the given string columns."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in dictionary_columns:
+        i = table.schema.get_field_index(name)
+        if i < 0 or pa.types.is_dictionary(table.schema.field(i).type):
+            continue
+        table = table.set_column(i, name, table.column(i).dictionary_encode())
+
+    # Write to a temp file first so readers never map a half-written file
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_arrow(path: str, columns: Optional[List[str]] = None, categorical: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Memory-maps an Arrow IPC file and converts only the requested columns.
+    Dictionary columns not listed in `categorical` are decoded back to plain strings.
+    """
+    categorical = set(categorical or [])
+    with pa.memory_map(path, "r") as source:
+        table = ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type) and field.name not in categorical:
+                table = table.set_column(i, field.name, pc.cast(table.column(i), field.type.value_type))
+        return table.to_pandas()
@@ -0,0 +1,163 @@
+"""
+Commute queries: listings within N walking minutes of any of several stations,
+e.g. "≤7 min to 門前仲町 or ≤5 min to 月島".
+
+Two indexes over the stored listings answer them without scanning every row:
+
+- per station, (minutes, url) pairs sorted by minutes, from every station in the access
+  text (station_walks), not just the first one the scraper picked as nearest_station.
+  A threshold is one bisect.
+- a grid of geocoded positions (lat/lng). Listings whose access text doesn't name a station
+  are still found by their distance to it (station positions from station_codes.json),
+  converted to an estimated walk.
+"""
+import math
+import os
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from access_parser import parse_station_walks, station_walks
+from config import COMMUTE_GRID_METERS, WALK_DETOUR_FACTOR, WALK_METERS_PER_MINUTE
+from models import normalize_station
+from stations import station_location
+
+# Store columns the index is built from
+INDEX_COLUMNS = ["station_walks", "access", "nearest_station", "walking_distance_actual", "lat", "lng"]
+
+_METERS_PER_DEGREE = 111_320
+
+
+class Commute(NamedTuple):
+    station: str      # "門前仲町駅"
+    minutes: int
+    estimated: bool   # From the straight-line distance, not the listing or a route lookup
+
+
+def parse_clauses(text: str) -> Dict[str, int]:
+    """"門前仲町:7,月島:5" -> {"門前仲町駅": 7, "月島駅": 5}. Raises ValueError on bad input."""
+    clauses = {}
+    for part in (text or "").replace("、", ",").split(","):
+        if not part.strip():
+            continue
+        station, sep, minutes = part.strip().rpartition(":")
+        if not sep or not station.strip() or not minutes.strip().isdigit():
+            raise ValueError(f"Expected STATION:MINUTES, got '{part.strip()}'")
+        clauses[normalize_station(station)] = int(minutes)
+    if not clauses:
+        raise ValueError("No station given")
+    return clauses
+
+
+def record_walks(record: Dict[str, Any]) -> Dict[str, int]:
+    """Walking minutes per station for one stored record. A measured walk to the nearest station wins."""
+    walks = parse_station_walks(record.get("station_walks")) or station_walks(record.get("access") or "")
+    nearest, measured = record.get("nearest_station"), record.get("walking_distance_actual")
+    if nearest and measured:
+        walks[nearest] = int(measured)
+    return walks
+
+
+class CommuteIndex:
+
+    def __init__(self):
+        # station -> ([minutes ...], [url ...]) sorted by minutes
+        self.by_station: Dict[str, Tuple[List[int], List[str]]] = {}
+        # (cell x, cell y) -> [(x, y, url)] in meters on a local flat projection
+        self.grid: Dict[Tuple[int, int], List[Tuple[float, float, str]]] = {}
+        self.stated: Dict[str, Dict[str, int]] = {}
+        self._cos_lat = 1.0
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]]) -> "CommuteIndex":
+        index = cls()
+        pairs: Dict[str, List[Tuple[int, str]]] = {}
+        located = []
+        for record in records:
+            url = record["url"]
+            walks = record_walks(record)
+            index.stated[url] = walks
+            for station, minutes in walks.items():
+                pairs.setdefault(station, []).append((minutes, url))
+            if record.get("lat") is not None and record.get("lng") is not None:
+                located.append((record["lat"], record["lng"], url))
+
+        for station, entries in pairs.items():
+            entries.sort()
+            index.by_station[station] = ([m for m, _ in entries], [u for _, u in entries])
+
+        if located:
+            # Longitude degrees shrink with latitude; one factor is exact enough across a city
+            index._cos_lat = math.cos(math.radians(sum(lat for lat, _, _ in located) / len(located)))
+            for lat, lng, url in located:
+                x, y = index._project(lat, lng)
+                index.grid.setdefault(index._cell(x, y), []).append((x, y, url))
+        return index
+
+    def _project(self, lat: float, lng: float) -> Tuple[float, float]:
+        return lng * _METERS_PER_DEGREE * self._cos_lat, lat * _METERS_PER_DEGREE
+
+    @staticmethod
+    def _cell(x: float, y: float) -> Tuple[int, int]:
+        return int(x // COMMUTE_GRID_METERS), int(y // COMMUTE_GRID_METERS)
+
+    def stated_within(self, station: str, minutes: int) -> List[Tuple[str, int]]:
+        """(url, minutes) of listings whose access text (or route lookup) puts them within `minutes` of the station."""
+        entries = self.by_station.get(station)
+        if not entries:
+            return []
+        walk_minutes, urls = entries
+        end = bisect_right(walk_minutes, minutes)
+        return list(zip(urls[:end], walk_minutes[:end]))
+
+    def nearby(self, station: str, minutes: int) -> List[Tuple[str, int]]:
+        """(url, estimated minutes) of geocoded listings within `minutes` of the station's position."""
+        location = station_location(station)
+        if location is None or not self.grid:
+            return []
+        radius = minutes * WALK_METERS_PER_MINUTE / WALK_DETOUR_FACTOR
+        cx, cy = self._project(*location)
+        x0, y0 = self._cell(cx - radius, cy - radius)
+        x1, y1 = self._cell(cx + radius, cy + radius)
+        found = []
+        for gx in range(x0, x1 + 1):
+            for gy in range(y0, y1 + 1):
+                for x, y, url in self.grid.get((gx, gy), ()):
+                    distance = math.hypot(x - cx, y - cy)
+                    if distance <= radius:
+                        found.append((url, max(1, math.ceil(distance * WALK_DETOUR_FACTOR / WALK_METERS_PER_MINUTE))))
+        return found
+
+    def query(self, clauses: Dict[str, int]) -> Dict[str, Commute]:
+        """
+        {url: best Commute} for listings within the minutes of any station in clauses
+        ({"門前仲町駅": 7, "月島駅": 5}). A walk stated for a station is trusted over an
+        estimate, so a listing stated as 9 minutes away isn't matched by a 6-minute estimate.
+        """
+        best: Dict[str, Commute] = {}
+
+        def offer(url, commute):
+            current = best.get(url)
+            if current is None or commute.minutes < current.minutes:
+                best[url] = commute
+
+        for station, minutes in clauses.items():
+            for url, walk in self.stated_within(station, minutes):
+                offer(url, Commute(station, walk, False))
+            for url, walk in self.nearby(station, minutes):
+                if station not in self.stated.get(url, {}):
+                    offer(url, Commute(station, walk, True))
+        return best
+
+
+@lru_cache(maxsize=2)
+def _build_for(path: str, mtime: float) -> CommuteIndex:
+    # Plain csv reader: no pandas for read-only callers
+    from store_reader import read_properties
+    return CommuteIndex.build(read_properties(path, columns=INDEX_COLUMNS))
+
+
+def for_store(path: str) -> CommuteIndex:
+    """The index of a stored CSV, rebuilt only when the file changes (the web app queries it per request)."""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+    return _build_for(path, mtime)
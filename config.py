@@ -10,11 +10,87 @@ USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36
 REQUEST_HEADERS = {
     "User-Agent": USER_AGENT
 }
-REQUEST_DELAY = 0.5  # Seconds to wait between requests
+REQUEST_DELAY = 0.5  # Seconds between requests to a host not seen before (and after a backoff)
+# Requests (and browser pages) allowed in flight per host not seen before
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("MAX_CONNECTIONS_PER_HOST", "4"))
+# Adaptive rate control (scrapers/rate_control.py): while a host answers quickly and
+# without 403/429/503, its limit grows up to RATE_MAX_CONNECTIONS_PER_HOST and the pause
+# shrinks to RATE_MIN_INTERVAL; throttling or a response RATE_LATENCY_SPIKE_FACTOR times
+# slower than usual halves the limit. Learned limits are kept in RATE_LIMITS_PATH.
+# By default starts stay at least REQUEST_DELAY apart: only concurrency adapts upwards.
+RATE_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("RATE_MAX_CONNECTIONS_PER_HOST", "8"))
+RATE_MIN_INTERVAL = float(os.environ.get("RATE_MIN_INTERVAL", str(REQUEST_DELAY)))
+RATE_MAX_INTERVAL = 30.0
+RATE_LATENCY_SPIKE_FACTOR = 4.0
+RATE_LIMITS_PATH = os.path.join(BASE_DIR, "rate_limits.json")
+
+# Result pages are parsed in PARSE_WORKERS processes (scrapers/parse_pool.py), so parsing
+# runs on every core while requests are in flight; 0 parses them in the main process
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Sites searched, by source name (scrapers/registry.py). HOME'S ("Homes") blocks the
+# scraper (WAF); its stored listings are still verified.
+SEARCH_SOURCES = [s for s in os.environ.get("SEARCH_SOURCES", "SUUMO,AtHome").split(",") if s]
+
+# Incremental search: scrapers that support it sort newest-first and stop at the first
+# page of already-known listings. A full sweep (all pages) runs at most this often.
+FULL_SWEEP_INTERVAL_HOURS = float(os.environ.get("FULL_SWEEP_INTERVAL_HOURS", "24"))
+SCRAPE_STATE_PATH = os.path.join(BASE_DIR, "scrape_state.json")
+# --daemon: incremental search every DAEMON_SEARCH_INTERVAL_MINUTES; between searches up to
+# DAEMON_VERIFY_BATCH stored listings are re-checked, a stable listing at most every
+# DAEMON_VERIFY_INTERVAL_HOURS (doubling with each unchanged check, up to 32x)
+DAEMON_SEARCH_INTERVAL_MINUTES = float(os.environ.get("DAEMON_SEARCH_INTERVAL_MINUTES", "15"))
+DAEMON_VERIFY_BATCH = int(os.environ.get("DAEMON_VERIFY_BATCH", "50"))
+DAEMON_VERIFY_INTERVAL_HOURS = float(os.environ.get("DAEMON_VERIFY_INTERVAL_HOURS", "6"))
+
+# Detail-page enrichment (building age, floor, deposit/key money, orientation) of new listings.
+# Off by default: one extra request per listing on its first sighting. Parsed fields are
+# cached per URL for DETAIL_CACHE_TTL_DAYS; the fetch also serves as that run's availability check.
+DETAIL_PAGES_ENABLED = os.environ.get("DETAIL_PAGES_ENABLED", "0") == "1"
+DETAIL_CACHE_PATH = os.path.join(BASE_DIR, "detail_cache.json")
+DETAIL_CACHE_TTL_DAYS = float(os.environ.get("DETAIL_CACHE_TTL_DAYS", "90"))
+
+# Journal of completed steps of the current scrape, used by --resume after a crash or cancel
+RUN_JOURNAL_PATH = os.path.join(BASE_DIR, "run_journal.jsonl")
+# Older journals are ignored: listings will have changed since then
+RUN_JOURNAL_MAX_AGE_HOURS = float(os.environ.get("RUN_JOURNAL_MAX_AGE_HOURS", "6"))
 
 # Search configuration (Example)
+# User conditions merged over SEARCH_CONDITIONS: one condition set, or several named
+# profiles {"profiles": {name: conditions}} searched together (see search_profiles.py)
+SEARCH_CONDITIONS_PATH = os.path.join(BASE_DIR, "search_conditions.json")
 SEARCH_CONDITIONS = {
     "min_price": 50000,
     "max_price": 150000,
     "areas": ["Tokyo", "Kanagawa"]
 }
+
+# Record/replay configuration
+# "record" stores every HTTP/browser/Maps response in ARCHIVE_PATH,
+# "replay" serves them back from it without touching the network.
+ARCHIVE_MODE = os.environ.get("SCRAPE_ARCHIVE_MODE", "off")
+ARCHIVE_PATH = os.environ.get("SCRAPE_ARCHIVE_PATH", os.path.join(BASE_DIR, "scrape_archive.jsonl.gz"))
+
+# Storage configuration
+# "csv" reads/writes properties.csv only. "arrow" also keeps a memory-mapped
+# columnar copy (properties.arrow, needs pyarrow) for fast, column-projected reads.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "csv")
+
+# Append-only listing change log (price changes, ended/reappeared), kept next to the CSV
+HISTORY_ENABLED = os.environ.get("HISTORY_ENABLED", "1") == "1"
+HISTORY_DIR_NAME = "history"
+
+# Commute queries (commute_index.py): a straight-line distance to a station becomes
+# minutes at the 80 m/min of Japanese listings, padded for streets not running straight
+WALK_METERS_PER_MINUTE = 80
+WALK_DETOUR_FACTOR = float(os.environ.get("WALK_DETOUR_FACTOR", "1.3"))
+COMMUTE_GRID_METERS = 250
+
+# Bigram search index over title/address/access (properties.index.json), rebuilt on save
+TEXT_INDEX_ENABLED = os.environ.get("TEXT_INDEX_ENABLED", "1") == "1"
+
+# Columns read by templates/index.html (everything except the long access text)
+PAGE_COLUMNS = [
+    "status", "title", "total_price", "price", "admin_fee", "layout", "area",
+    "nearest_station", "walk_minutes", "walking_distance_actual", "address", "url", "last_updated", "source", "cluster"
+]
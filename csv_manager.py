@@ -1,108 +1,323 @@
 import pandas as pd
 import os
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 import logging
+import columnar_store
+import config
+import listing_history
+import store_reader
+import text_index
+from models import Property
 
 logger = logging.getLogger(__name__)
 
 class CSVManager:
-    def __init__(self, file_path="properties.csv"):
+    # Schema shared with the pandas-free reader (store_reader)
+    CATEGORY_COLUMNS = store_reader.CATEGORY_COLUMNS
+    FLOAT_COLUMNS = store_reader.FLOAT_COLUMNS
+    INT_COLUMNS = store_reader.INT_COLUMNS
+    FLOAT_DECIMALS = store_reader.FLOAT_DECIMALS
+    # Free-text columns that still repeat per room; dictionary-encoded in the Arrow file
+    DICTIONARY_COLUMNS = ["title", "address", "access", "station_walks"]
+
+    def __init__(self, file_path="properties.csv", backend=None, history=None):
         self.file_path = file_path
-        # Reordered columns as requested
-        self.columns = [
-            "status", "title", "total_price", "price", "admin_fee", 
-            "layout", "area", "nearest_station", "walk_minutes", "walking_distance_actual", "address", "access", "url", "last_updated", "source"
-        ]
-
-    def save_properties(self, properties_data: List[Dict[str, Any]]):
-        # Convert new data to DataFrame
-        new_df = pd.DataFrame(properties_data)
-        if new_df.empty:
-            # If no new data, we might still be updating statuses of existing data passed in
-            pass
+        self.backend = backend or config.STORAGE_BACKEND
+        if self.backend == "arrow" and not columnar_store.available():
+            logger.warning("pyarrow is not installed. Falling back to CSV storage.")
+            self.backend = "csv"
+        self.arrow_path = os.path.splitext(file_path)[0] + ".arrow"
+        # Free-text search index over title/address/access, rebuilt on every write
+        self.index_path = text_index.index_path(file_path) if config.TEXT_INDEX_ENABLED else None
+        # Change log of prices/statuses; pass history=False to disable
+        if history is None and config.HISTORY_ENABLED:
+            history = listing_history.ListingHistory(
+                os.path.join(os.path.dirname(os.path.abspath(file_path)), config.HISTORY_DIR_NAME))
+        self.history: Optional[listing_history.ListingHistory] = history or None
+        self.columns = list(store_reader.STORE_COLUMNS)
+        # In-memory store indexed by URL. Loaded once and written back by flush().
+        self._df: Optional[pd.DataFrame] = None
+        self._mtime: Optional[float] = None
+        self._dirty = False
+        self._batch_depth = 0
 
-        # Add/Update timestamp
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if not new_df.empty:
-            new_df["last_updated"] = current_time
-            if "status" not in new_df.columns:
-                new_df["status"] = "active" # Default for new scrapes
-        
-        # Ensure all columns exist
+    @property
+    def dtypes(self) -> Dict[str, Any]:
+        dtypes = {col: "category" for col in self.CATEGORY_COLUMNS}
+        dtypes.update({col: "float32" for col in self.FLOAT_COLUMNS})
+        dtypes.update({col: "Int16" for col in self.INT_COLUMNS})
+        return dtypes
+
+    def _coerce(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Adds missing columns and applies the store dtypes."""
         for col in self.columns:
-            if col not in new_df.columns:
-                new_df[col] = None
-        
-        # Select and order columns
-        new_df = new_df[self.columns]
-
-        if os.path.exists(self.file_path):
-            try:
-                existing_df = pd.read_csv(self.file_path)
-                
-                # Ensure existing DF has all columns (for migration)
-                for col in self.columns:
-                    if col not in existing_df.columns:
-                        existing_df[col] = None
-                        if col == "status":
-                            existing_df["status"] = "active" # Assume active if missing
-
-                # Merge logic:
-                # 1. Set index to URL for easy update
-                existing_df.set_index("url", inplace=True)
-                new_df.set_index("url", inplace=True)
-                
-                # 2. Update existing with new data
-                # combine_first prefers the caller (existing_df) if not null, so we use update or manual
-                # We want new_df to overwrite existing_df for overlapping rows
-                existing_df.update(new_df)
-                
-                # 3. Append new rows that are not in existing
-                new_rows = new_df[~new_df.index.isin(existing_df.index)]
-                combined_df = pd.concat([existing_df, new_rows])
-                
-                # Reset index
-                combined_df.reset_index(inplace=True)
-                
-                # Reorder columns
-                combined_df = combined_df[self.columns]
-                
-                combined_df.to_csv(self.file_path, index=False, encoding="utf-8-sig")
-                logger.info(f"Updated CSV. Total properties: {len(combined_df)}")
-            except Exception as e:
-                logger.error(f"Error updating CSV: {e}")
-                raise
+            if col not in df.columns:
+                df[col] = None
+        return self._apply_dtypes(df[self.columns])
+
+    def _apply_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        for col, dtype in self.dtypes.items():
+            if col not in df.columns:
+                continue
+            if dtype == "category":
+                df[col] = df[col].astype("category")
+            elif dtype == "Int16":
+                df[col] = pd.to_numeric(df[col], errors="coerce").round().astype("Int16")
+            else:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+        return df
+
+    def _arrow_is_fresh(self) -> bool:
+        """The Arrow copy can be read instead of the CSV if it's at least as new (e.g. not after a git pull)."""
+        if self.backend != "arrow" or not os.path.exists(self.arrow_path):
+            return False
+        if not os.path.exists(self.file_path):
+            return True
+        return os.path.getmtime(self.arrow_path) >= os.path.getmtime(self.file_path)
+
+    def load(self) -> pd.DataFrame:
+        """Returns the store, reading the file only if it hasn't been loaded or changed on disk."""
+        mtime = os.path.getmtime(self.file_path) if os.path.exists(self.file_path) else None
+        if self._df is not None and (self._dirty or mtime == self._mtime):
+            return self._df
+
+        if self._arrow_is_fresh():
+            df = columnar_store.read_arrow(self.arrow_path, categorical=self.CATEGORY_COLUMNS)
+        elif mtime is None:
+            df = pd.DataFrame(columns=self.columns)
         else:
-            new_df.to_csv(self.file_path, index=False, encoding="utf-8-sig")
-            logger.info(f"Created new CSV with {len(new_df)} properties.")
+            df = pd.read_csv(self.file_path, dtype={k: v for k, v in self.dtypes.items() if v == "category"})
+            # Migration: older files may not have every column
+            if "status" not in df.columns:
+                df["status"] = "active"  # Assume active if missing
+        df = self._coerce(df)
+        df = df[df["url"].notna()].drop_duplicates("url", keep="last").set_index("url")
+
+        self._df = df
+        self._mtime = mtime
+        self._dirty = False
+        return df
+
+    def upsert(self, properties_data: List[Union[Property, Dict[str, Any]]], timestamp: Optional[str] = None):
+        """
+        Applies new/updated properties (Property records or flat dicts) to the in-memory store.
+        Non-null values overwrite existing rows matched by URL; unseen URLs are appended.
+        """
+        if not properties_data:
+            return
+        store = self.load()
+
+        new_df = pd.DataFrame([p.to_dict() if isinstance(p, Property) else p for p in properties_data])
+        # Add/Update timestamp
+        new_df["last_updated"] = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if "status" not in new_df.columns:
+            new_df["status"] = "active" # Default for new scrapes
+        new_df = self._coerce(new_df)
+        new_df = new_df[new_df["url"].notna()].drop_duplicates("url", keep="last").set_index("url")
+
+        # Both frames must share categories before values can move between them
+        for col in self.CATEGORY_COLUMNS:
+            categories = store[col].cat.categories.union(new_df[col].cat.categories)
+            store[col] = store[col].cat.set_categories(categories)
+            new_df[col] = new_df[col].cat.set_categories(categories)
+
+        # Hash lookup of every incoming URL against the store index
+        positions = store.index.get_indexer(new_df.index)
+        is_update = positions >= 0
+
+        if self.history is not None:
+            self._record_history(store, new_df, positions, is_update)
+
+        if is_update.any():
+            rows = positions[is_update]
+            updates = new_df[is_update]
+            for j, col in enumerate(store.columns):
+                values = updates[col]
+                valid = values.notna().to_numpy()
+                if valid.any():
+                    store.iloc[rows[valid], j] = values[valid].to_numpy()
+
+        inserts = new_df[~is_update]
+        if len(inserts):
+            store = pd.concat([store, inserts])
+
+        self._df = store
+        self._dirty = True
+        logger.info(f"Upserted {int(is_update.sum())} updated and {len(inserts)} new properties.")
+
+    def flush(self):
+        """Writes the store back to disk if it changed."""
+        if self._df is None or not self._dirty:
+            return
+        try:
+            df = self._df.reset_index()[self.columns]
+            df.to_csv(self.file_path, index=False, encoding="utf-8-sig")
+            if self.backend == "arrow":
+                # Written after the CSV so its mtime marks it as fresh
+                columnar_store.write_arrow(df, self.arrow_path, self.DICTIONARY_COLUMNS)
+            if self.index_path is not None:
+                # Also after the CSV, for the same freshness check
+                fields = ["url", *text_index.FIELDS]
+                text_index.TextIndex.build(df[fields].to_dict("records")).save(self.index_path)
+            self._mtime = os.path.getmtime(self.file_path)
+            self._dirty = False
+            if self.history is not None:
+                self.history.flush()
+            logger.info(f"Updated CSV. Total properties: {len(df)}")
+        except Exception as e:
+            logger.error(f"Error updating CSV: {e}")
+            raise
+
+    @staticmethod
+    def _status_event(old: Any, new: Any) -> Optional[str]:
+        if pd.isna(new) or old == new:
+            return None
+        if new == "ended":
+            return listing_history.ENDED
+        if old == "ended":
+            return listing_history.REAPPEARED
+        return None
+
+    def _bootstrap_history(self, store: pd.DataFrame):
+        """First run with history enabled: seed first_seen events from the rows already stored."""
+        if not self.history.is_empty or store.empty:
+            return
+        for url, row in self._to_python(store[["status", "price", "admin_fee", "last_updated"]]).iterrows():
+            self.history.record(url, listing_history.FIRST_SEEN, row["last_updated"] or "1970-01-01 00:00:00",
+                                price=row["price"], admin_fee=row["admin_fee"], status=row["status"])
+
+    def _record_history(self, store: pd.DataFrame, new_df: pd.DataFrame, positions, is_update):
+        """Queues change events by comparing incoming rows with the stored ones (before they are overwritten)."""
+        self._bootstrap_history(store)
+        incoming = self._to_python(new_df[["status", "price", "admin_fee", "last_updated"]])
+
+        for url, row in incoming[~is_update].iterrows():
+            self.history.record(url, listing_history.FIRST_SEEN, row["last_updated"],
+                                price=row["price"], admin_fee=row["admin_fee"], status=row["status"])
+
+        if not is_update.any():
+            return
+        current = self._to_python(store.iloc[positions[is_update]][["status", "price", "admin_fee"]])
+        updates = incoming[is_update]
+        # Vectorized comparison first; only changed rows are turned into events
+        price_changed = pd.Series(False, index=updates.index)
+        for col in ("price", "admin_fee"):
+            new, old = updates[col], current[col].set_axis(updates.index)
+            price_changed |= new.notna() & (old.isna() | (new != old))
+        status_changed = updates["status"].notna() & (updates["status"] != current["status"].set_axis(updates.index))
+
+        for url in updates.index[(price_changed | status_changed).to_numpy()]:
+            row = updates.loc[url]
+            old_status = current["status"].iloc[updates.index.get_loc(url)]
+            if price_changed[url]:
+                self.history.record(url, listing_history.PRICE_CHANGED, row["last_updated"],
+                                    price=row["price"], admin_fee=row["admin_fee"])
+            event = self._status_event(old_status, row["status"])
+            if event:
+                self.history.record(url, event, row["last_updated"], status=row["status"])
+
+    @contextmanager
+    def batch(self):
+        """Defers writes: everything saved inside the block is written once on exit."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def _maybe_flush(self):
+        if self._batch_depth == 0:
+            self.flush()
+
+    def save_properties(self, properties_data: List[Union[Property, Dict[str, Any]]]):
+        try:
+            self.upsert(properties_data)
+        except Exception as e:
+            logger.error(f"Error updating CSV: {e}")
+            raise
+        self._maybe_flush()
 
     def update_status(self, url: str, status: str):
         """Updates the status of a specific property."""
-        if not os.path.exists(self.file_path):
-            return
-        
         try:
-            df = pd.read_csv(self.file_path)
-            if "url" in df.columns:
-                mask = df["url"] == url
-                if mask.any():
-                    df.loc[mask, "status"] = status
-                    df.loc[mask, "last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    df.to_csv(self.file_path, index=False, encoding="utf-8-sig")
-                    logger.info(f"Updated status for {url} to {status}")
+            store = self.load()
+            if url in store.index:
+                if status not in store["status"].cat.categories:
+                    store["status"] = store["status"].cat.add_categories([status])
+                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                if self.history is not None:
+                    self._bootstrap_history(store)
+                    event = self._status_event(store.at[url, "status"], status)
+                    if event:
+                        self.history.record(url, event, now, status=status)
+                store.loc[url, "status"] = status
+                store.loc[url, "last_updated"] = now
+                self._dirty = True
+                logger.info(f"Updated status for {url} to {status}")
+                self._maybe_flush()
         except Exception as e:
             logger.error(f"Error updating status: {e}")
 
-    def get_all_properties(self) -> List[Dict[str, Any]]:
-        if not os.path.exists(self.file_path):
-            return []
+    def _read_columns(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the requested columns (url always included) in storage order.
+        If the store isn't loaded yet and a fresh Arrow file exists, only those columns
+        are read from the memory-mapped file instead of loading everything.
+        """
+        wanted = [c for c in self.columns if columns is None or c in columns or c == "url"]
+        if self._df is None and self._arrow_is_fresh():
+            df = columnar_store.read_arrow(self.arrow_path, columns=wanted, categorical=self.CATEGORY_COLUMNS)
+            return self._apply_dtypes(df)
+        return self.load().reset_index()[wanted]
+
+    def content_hash(self, exclude: Optional[List[str]] = None) -> int:
+        """Hash of the stored rows (ignoring `exclude` columns), to tell whether anything changed."""
+        df = self.load()
+        columns = [c for c in df.columns if c not in (exclude or [])]
+        return int(pd.util.hash_pandas_object(df[columns], index=True).sum())
+
+    def get_urls(self, source: Optional[str] = None) -> set:
+        """Returns the stored URLs, optionally only those of one source."""
         try:
-            df = pd.read_csv(self.file_path)
+            df = self._read_columns(["source"])
+            if source is not None:
+                df = df[df["source"] == source]
+            return set(df["url"])
+        except Exception as e:
+            logger.error(f"Error reading CSV: {e}")
+            return set()
+
+    def get_field_map(self, column: str) -> Dict[str, Any]:
+        """Returns {url: value} for rows where column is set, without materializing every row."""
+        try:
+            df = self._to_python(self._read_columns([column]))
+            return {url: value for url, value in zip(df["url"], df[column]) if value is not None}
+        except Exception as e:
+            logger.error(f"Error reading CSV: {e}")
+            return {}
+
+    def _to_python(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Converts store dtypes to plain Python values (None for missing) for JSON/templating."""
+        df = df.copy()
+        for col in df.columns:
+            if col in self.FLOAT_COLUMNS:
+                df[col] = df[col].astype("float64").round(self.FLOAT_DECIMALS)
             # Replace NaN with None for valid JSON serialization
             # Must cast to object first to allow None in float columns
-            df = df.astype(object).where(pd.notnull(df), None)
-            return df.to_dict("records")
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+        return df
+
+    def get_all_properties(self, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Returns stored properties as dicts. Pass columns to read only those fields (plus url)."""
+        try:
+            df = self._read_columns(columns)
+            if df.empty:
+                return []
+            return self._to_python(df).to_dict("records")
         except Exception as e:
             logger.error(f"Error reading CSV: {e}")
             return []
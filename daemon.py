@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import logging
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from config import (DAEMON_SEARCH_INTERVAL_MINUTES, DAEMON_VERIFY_BATCH, DAEMON_VERIFY_INTERVAL_HOURS,
+                    SCRAPE_STATE_PATH)
+from pipeline import generate_html, run_scrape_async
+from run_report import metrics
+from scrape_state import ScrapeState
+from scrapers.registry import ScraperRegistry
+from scrapers.rate_control import rate_control
+
+logger = logging.getLogger(__name__)
+
+# A listing checked as active this many times in a row is considered long-stable
+MAX_BACKOFF_EXPONENT = 5
+
+
+class VerificationQueue:
+    """
+    Decides which stored listings to re-check, most urgent first:
+      1. listings missing from the latest full sweep of their source, most recently seen first
+         (they have most likely just ended)
+      2. the others once they are due; every check that finds a listing still active doubles
+         its interval, so long-stable listings come last
+    """
+
+    def __init__(self, interval_hours: float):
+        self.interval = interval_hours * 3600
+        self.last_seen: Dict[str, float] = {}
+        self.last_checked: Dict[str, float] = {}
+        self.stable_checks: Dict[str, int] = {}
+        self.missing: Set[str] = set()
+
+    def seen(self, urls: Iterable[str], now: float):
+        for url in urls:
+            self.last_seen[url] = now
+            self.missing.discard(url)
+
+    def mark_missing(self, urls: Iterable[str]):
+        self.missing.update(urls)
+
+    def checked(self, url: str, active: bool, now: float):
+        self.last_checked[url] = now
+        if active and url not in self.missing:
+            self.stable_checks[url] = self.stable_checks.get(url, 0) + 1
+        else:
+            # Still listed but absent from search (or ended): start the backoff over
+            self.stable_checks[url] = 0
+        self.missing.discard(url)
+
+    def due(self, urls: Iterable[str], now: float, limit: int) -> List[str]:
+        entries = []
+        for url in urls:
+            if url in self.missing:
+                entries.append((0, -self.last_seen.get(url, 0), url))
+                continue
+            backoff = 2 ** min(self.stable_checks.get(url, 0), MAX_BACKOFF_EXPONENT)
+            due_at = self.last_checked.get(url, 0) + self.interval * backoff
+            if due_at <= now:
+                entries.append((1, due_at, url))
+        return [url for _, _, url in heapq.nsmallest(limit, entries)]
+
+
+def _timestamp(value) -> float:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Daemon:
+    """
+    Long-running scrape loop (main.py --daemon). The scraper registry (HTTP sessions,
+    browsers, detail cache), the route cache and the property store stay in memory
+    between cycles. Each cycle runs an incremental search (a full sweep when due),
+    re-checks a batch of stored listings from the VerificationQueue, and writes the
+    CSV / index.html only if the data changed.
+    """
+
+    def __init__(self, csv_manager, gmaps_client, conditions, profiles=None, force_recalc=False):
+        self.csv_manager = csv_manager
+        self.gmaps_client = gmaps_client
+        self.conditions = conditions
+        self.profiles = profiles
+        self.force_recalc = force_recalc
+        # Open for the daemon's lifetime: sessions, browsers and caches stay warm between cycles
+        self.registry = ScraperRegistry()
+        self.state = ScrapeState(SCRAPE_STATE_PATH)
+        self.queue = VerificationQueue(DAEMON_VERIFY_INTERVAL_HOURS)
+        self.interval = DAEMON_SEARCH_INTERVAL_MINUTES * 60
+        self.report_path = os.path.join(os.path.dirname(os.path.abspath(csv_manager.file_path)), "run_report.json")
+        self._published_hash = None
+        self._stop = None
+
+    def _active_listings(self) -> List[Dict]:
+        return [p for p in self.csv_manager.get_all_properties(columns=["status", "source", "last_updated", "cluster"])
+                if p.get("status") == "active"]
+
+    def _seed_queue(self):
+        # Being in a search result counts as a check, so start from last_updated
+        for p in self._active_listings():
+            self.queue.last_checked[p["url"]] = _timestamp(p.get("last_updated"))
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop.set)
+
+        logger.info(f"Daemon started. Searching every {DAEMON_SEARCH_INTERVAL_MINUTES:g} minutes.")
+        self._seed_queue()
+        # Writes happen in publish(), not on every save
+        with self.csv_manager.batch():
+            try:
+                await self.registry.open()
+                while not self._stop.is_set():
+                    await self.cycle()
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), timeout=self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                await self.registry.close()
+                self.state.save()
+                rate_control.save()
+        logger.info("Daemon stopped.")
+
+    async def cycle(self):
+        metrics.reset()
+        try:
+            properties, swept_sources = await run_scrape_async(
+                self.csv_manager, self.gmaps_client, self.conditions, self.force_recalc,
+                registry=self.registry, state=self.state, check_missing=False, write=False,
+                # Search hits are checked through the queue like every other listing
+                verify_results=False)
+
+            now = time.time()
+            found = {p.url for p in properties}
+            self.queue.seen(found, now)
+            if swept_sources:
+                self.queue.mark_missing(p["url"] for p in self._active_listings()
+                                        if p.get("source") in swept_sources and p["url"] not in found)
+
+            with metrics.stage("verify_queue"):
+                await self.verify_due(now)
+            self.state.save()
+            rate_control.save()
+            self.publish()
+        except Exception as e:
+            logger.error(f"Daemon cycle failed: {e}")
+
+    async def verify_due(self, now: float):
+        listings = {p["url"]: p for p in self._active_listings()}
+        # Copies of one room are checked once while it is active; once one has ended the
+        # others are checked on their own (a cluster may hold identical rooms of one building)
+        members: Dict[str, List[str]] = {}
+        for url, p in listings.items():
+            members.setdefault(p.get("cluster") or url, []).append(url)
+        representatives = [urls[0] for urls in members.values()]
+
+        due = [url for url in self.queue.due(representatives, now, DAEMON_VERIFY_BATCH)
+               if self.registry.get(listings[url].get("source")) is not None]
+        if not due:
+            return
+        logger.info(f"Re-checking {len(due)} listings ({len(self.queue.missing)} missing from search).")
+
+        async def check(url):
+            scraper = self.registry.get(listings[url]["source"])
+            metrics.incr("verify_queue.checked")
+            return url, await scraper.check_availability_async(url)
+
+        results = await asyncio.gather(*(check(url) for url in due))
+        copies = [member for url, is_active in results if not is_active
+                  for member in members[listings[url].get("cluster") or url] if member != url]
+        results += await asyncio.gather(*(check(url) for url in copies))
+
+        for url, is_active in results:
+            self.queue.checked(url, is_active, now)
+            if not is_active:
+                metrics.incr("verify_queue.ended")
+                self.csv_manager.update_status(url, "ended")
+
+    def publish(self):
+        """Writes the store, index.html and run report, but only when the listings changed."""
+        content = self.csv_manager.content_hash(exclude=["last_updated"])
+        if content == self._published_hash:
+            logger.info("No listing changes this cycle. Output left as is.")
+            return
+        with metrics.stage("csv_write"):
+            self.csv_manager.flush()
+            if self.csv_manager.history is not None:
+                self.csv_manager.history.compact()
+        with metrics.stage("generate_html"):
+            generate_html(self.csv_manager, profiles=self.profiles)
+        metrics.write(self.report_path)
+        self._published_hash = content
+        logger.info("Listings changed. Regenerated output.")
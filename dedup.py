@@ -0,0 +1,171 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import Property
+
+# "パークアクシス豊洲（PARK AXIS）" -> alias in brackets is dropped
+_ALIAS = re.compile(r'[（(][^）)]*[）)]')
+_SPACES = re.compile(r'\s+')
+_GENERIC_NAMES = {"", "unknown"}
+
+# Store columns add_stored() matches on (plus url)
+STORED_COLUMNS = ["title", "address", "layout", "area", "price"]
+
+# Two listings of the same room may round area/rent differently
+AREA_TOLERANCE = 0.5    # m²
+PRICE_TOLERANCE = 0.05  # 万円
+
+
+def normalize_name(title: str) -> str:
+    name = unicodedata.normalize("NFKC", title or "")
+    name = _ALIAS.sub("", name)
+    return _SPACES.sub("", name).lower()
+
+
+def normalize_address(address: str) -> str:
+    """"東京都江東区豊洲５丁目3番" -> "江東区豊洲5-3" so sources with different precision compare as prefixes."""
+    address = _SPACES.sub("", unicodedata.normalize("NFKC", address or ""))
+    if address.startswith("東京都"):
+        address = address[3:]
+    for marker in ("丁目", "番地", "番"):
+        address = address.replace(marker, "-")
+    return address.replace("号", "").rstrip("-")
+
+
+def _addresses_match(a: str, b: str) -> bool:
+    if not a or not b:
+        return True
+    return a.startswith(b) or b.startswith(a)
+
+
+class DuplicateIndex:
+    """
+    Clusters listings of the same physical room (same building on SUUMO and AtHome,
+    or one room posted by several agents) as they are added.
+
+    Listings are blocked by (normalized building name, layout) - or by address when the
+    name is generic - and matched inside a block on address prefix, area and rent.
+    Matches are merged with union-find, so A~B and B~C end up in one cluster.
+
+    Listings already in the store are added first with add_stored(): a new copy of a
+    stored room (e.g. found on AtHome after an incremental SUUMO search skipped the
+    SUUMO copy) joins its cluster instead of starting one.
+    """
+
+    def __init__(self, known_clusters: Optional[Dict[str, str]] = None):
+        # {url: cluster id} from the store, so clusters keep their id across runs
+        self.known_clusters = known_clusters or {}
+        self.properties: List[Property] = []
+        # Node of each added Property, and (node, record) of each stored listing
+        self._property_nodes: List[int] = []
+        self._stored: List[Tuple[int, Dict[str, Any]]] = []
+        self._copies: Dict[str, List[Dict[str, Any]]] = {}
+        self._parent: List[int] = []
+        self._blocks: Dict[Tuple[str, str], List[int]] = {}
+        # (normalized address, area, price) per node
+        self._keys: List[Tuple[str, float, float]] = []
+
+    def _find(self, i: int) -> int:
+        while self._parent[i] != i:
+            self._parent[i] = self._parent[self._parent[i]]
+            i = self._parent[i]
+        return i
+
+    def _union(self, i: int, j: int):
+        root_i, root_j = self._find(i), self._find(j)
+        if root_i != root_j:
+            # Keep the earlier listing as root so the representative is deterministic
+            self._parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    def _add(self, title: str, address: str, layout: str, area: float, price: float) -> int:
+        i = len(self._parent)
+        self._parent.append(i)
+        address = normalize_address(address)
+        self._keys.append((address, area or 0.0, price or 0.0))
+
+        name = normalize_name(title)
+        if name in _GENERIC_NAMES:
+            name = "@" + address
+        layout = unicodedata.normalize("NFKC", layout or "").upper()
+        block = self._blocks.setdefault((name, layout), [])
+
+        _, area, price = self._keys[i]
+        for j in block:
+            other_address, other_area, other_price = self._keys[j]
+            if (abs(other_area - area) <= AREA_TOLERANCE
+                    and abs(other_price - price) <= PRICE_TOLERANCE
+                    and _addresses_match(other_address, address)):
+                self._union(i, j)
+        block.append(i)
+        return i
+
+    def add(self, p: Property) -> int:
+        self.properties.append(p)
+        node = self._add(p.title, p.address, p.layout, p.area, p.price)
+        self._property_nodes.append(node)
+        return node
+
+    def add_all(self, properties: List[Property]):
+        for p in properties:
+            self.add(p)
+
+    def add_stored(self, record: Dict[str, Any]):
+        """A stored listing (url, title, address, layout, area, price); new copies of it join its cluster."""
+        node = self._add(record.get("title"), record.get("address"), record.get("layout"),
+                         record.get("area"), record.get("price"))
+        self._stored.append((node, record))
+
+    def clusters(self) -> List[List[Property]]:
+        """
+        Returns clusters of the added Properties in insertion order (first member is the
+        representative) and sets Property.cluster on every member, singletons included
+        (their own URL), so an id a listing had in an earlier cluster is overwritten in the store.
+        Stored listings aren't members; see stored_copies().
+        """
+        groups: Dict[int, List[Property]] = {}
+        for node, p in zip(self._property_nodes, self.properties):
+            groups.setdefault(self._find(node), []).append(p)
+        copies: Dict[int, List[Dict[str, Any]]] = {}
+        for node, record in self._stored:
+            root = self._find(node)
+            if root in groups:
+                copies.setdefault(root, []).append(record)
+
+        self._copies = {}
+        for root, members in groups.items():
+            stored = copies.get(root, [])
+            # Reuse an id the store already knows, otherwise the earliest listing's URL. A known
+            # id counts only if it is a listing's URL: when a cluster splits, its old id stays
+            # with the part holding that listing.
+            urls = {m.url for m in members} | {r["url"] for r in stored}
+            known = sorted(self.known_clusters[url] for url in urls if self.known_clusters.get(url) in urls)
+            cluster_id = known[0] if known else (stored[0]["url"] if stored else members[0].url)
+            for m in members:
+                m.cluster = cluster_id
+            if stored:
+                self._copies[cluster_id] = stored
+        return list(groups.values())
+
+    def stored_copies(self, cluster_id: str) -> List[Dict[str, Any]]:
+        """Stored listings in a cluster returned by clusters() (records as passed to add_stored)."""
+        return self._copies.get(cluster_id, [])
+
+
+def merge_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapses stored rows of one cluster into a single record for the UI.
+    The merged record takes its fields from an active member and lists every copy in "sources".
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for r in records:
+        key = r.get("cluster") or r.get("url")
+        source = {"url": r.get("url"), "source": r.get("source"), "status": r.get("status")}
+        if key not in merged:
+            merged[key] = dict(r, sources=[source])
+            continue
+        record = merged[key]
+        record["sources"].append(source)
+        if record.get("status") == "ended" and r.get("status") != "ended":
+            merged[key] = dict(r, sources=record["sources"])
+    return list(merged.values())
@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class DetailCache:
+    """
+    Parsed detail-page fields per listing URL (see detail_parser), persisted between runs
+    so each listing's detail page is fetched once. Entries older than the TTL are fetched
+    again and dropped on save; a listing rarely lives that long.
+    """
+
+    def __init__(self, path: str, ttl_days: float):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except Exception as e:
+                logger.error(f"Failed to load detail cache: {e}")
+
+    def _fresh(self, entry: Dict[str, Any], now: datetime) -> bool:
+        return now - datetime.strptime(entry["fetched_at"], TIME_FORMAT) < self.ttl
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """The cached fields, or None if the page hasn't been fetched within the TTL."""
+        entry = self.entries.get(url)
+        if entry is None or not self._fresh(entry, datetime.now()):
+            return None
+        return entry["fields"]
+
+    def put(self, url: str, fields: Dict[str, Any]):
+        self.entries[url] = {"fetched_at": datetime.now().strftime(TIME_FORMAT), "fields": fields}
+
+    def save(self):
+        now = datetime.now()
+        self.entries = {url: e for url, e in self.entries.items() if self._fresh(e, now)}
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f, ensure_ascii=False, indent=1)
+        except Exception as e:
+            logger.error(f"Failed to save detail cache: {e}")
@@ -0,0 +1,118 @@
+"""
+Fields of a listing's detail page that the result pages leave out: building age, floor,
+deposit (敷金), key money (礼金) and orientation.
+
+Both sites lay the page out as label/value pairs, in tables (<th>/<td>), definition
+lists (<dt>/<dd>) or inline "敷金: 13万円" notes, under labels that differ per site:
+
+    SUUMO:  築年数 "築12年"           階 "3階/10階建"       向き "南"      敷金/礼金 "13万円/-"
+    AtHome: 築年月 "2013年3月(築12年)" 所在階/階数 "3階/10階建" 主要採光面 "南"  敷金 "1ヶ月"
+
+so values are found by label keyword rather than by position.
+"""
+import re
+from datetime import date
+from typing import Any, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+from models import to_float
+
+DETAIL_FIELDS = ("building_age", "floor", "deposit", "key_money", "orientation")
+
+_LABEL_NOTE = re.compile(r'^\s*([^:：]{1,12})[:：]\s*(.+?)\s*$')
+_AGE = re.compile(r'築\s*(\d+)\s*年')
+_BUILT = re.compile(r'(\d{4})\s*年')
+_FLOOR = re.compile(r'(B|地下)?\s*(\d+)\s*階')
+_MONTHS = re.compile(r'(\d+(?:\.\d+)?)\s*[ヶヵか箇カケ]?月')
+_ORIENTATIONS = ("北東", "北西", "南東", "南西", "北", "南", "東", "西")
+
+
+def label_values(soup: BeautifulSoup) -> Dict[str, str]:
+    """Label -> value text of every labelled pair on the page (the first wins)."""
+    pairs: Dict[str, str] = {}
+    for th in soup.find_all(["th", "dt"]):
+        value = th.find_next_sibling(["td", "dd"])
+        if value is not None:
+            pairs.setdefault(th.get_text(" ", strip=True), value.get_text(" ", strip=True))
+    for span in soup.find_all(["span", "li"]):
+        match = _LABEL_NOTE.match(span.get_text(" ", strip=True))
+        if match:
+            pairs.setdefault(match.group(1).strip(), match.group(2))
+    return pairs
+
+
+def _find(pairs: Dict[str, str], *keywords: str) -> Optional[str]:
+    for label, value in pairs.items():
+        if any(k in label for k in keywords):
+            return value
+    return None
+
+
+def _age(value: Optional[str], today: date) -> Optional[int]:
+    if not value:
+        return None
+    if "新築" in value:
+        return 0
+    match = _AGE.search(value)
+    if match:
+        return int(match.group(1))
+    match = _BUILT.search(value)
+    if match:
+        return max(0, today.year - int(match.group(1)))
+    return None
+
+
+def _floor(value: Optional[str]) -> Optional[int]:
+    match = _FLOOR.search(value or "")
+    if not match:
+        return None
+    return -int(match.group(2)) if match.group(1) else int(match.group(2))
+
+
+def _money(value: Optional[str], rent: float) -> Optional[float]:
+    """Man-yen. "13万円" -> 13.0, "1ヶ月" -> one month of rent, "-" / "なし" -> 0."""
+    if value is None:
+        return None
+    value = value.strip()
+    if value in ("", "-", "－", "なし", "無"):
+        return 0.0
+    if "万" in value:
+        return to_float(value)
+    months = _MONTHS.search(value)
+    if months:
+        return round(float(months.group(1)) * rent, 4)
+    if "円" in value:
+        return to_float(value) / 10000.0
+    return None
+
+
+def _orientation(value: Optional[str]) -> Optional[str]:
+    for direction in _ORIENTATIONS:
+        if direction in (value or ""):
+            return direction
+    return None
+
+
+def parse_detail(html: str, rent: float = 0.0, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    The DETAIL_FIELDS found on a detail page; missing ones are left out.
+    `rent` (Man-yen) converts deposits given in months.
+    """
+    pairs = label_values(BeautifulSoup(html, "html.parser"))
+    # SUUMO may put both in one pair: "敷金/礼金" -> "13万円/-"
+    combined = _find(pairs, "敷金/礼金", "敷金・礼金")
+    if combined is not None and "/" in combined:
+        deposit, key_money = combined.split("/", 1)
+    else:
+        deposit, key_money = _find(pairs, "敷金"), _find(pairs, "礼金")
+
+    fields = {
+        "building_age": _age(_find(pairs, "築年数", "築年月"), today or date.today()),
+        # Not just any label with 階: "階建" is the building's height
+        "floor": _floor(_find(pairs, "所在階") or pairs.get("階")),
+        "deposit": _money(deposit, rent),
+        "key_money": _money(key_money, rent),
+        "orientation": _orientation(_find(pairs, "向き", "採光", "方位")),
+    }
+    return {k: v for k, v in fields.items() if v is not None}
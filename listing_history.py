@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Event types
+FIRST_SEEN = "first_seen"
+PRICE_CHANGED = "price_changed"
+ENDED = "ended"
+REAPPEARED = "reappeared"
+
+
+class ListingHistory:
+    """
+    Append-only change log of listings, partitioned by month:
+
+        history/events-2026-10.jsonl   one JSON event per line
+        history/snapshot-2026-09.json  state of every URL at the end of a closed month (written by compact())
+        history/index.json             partition time ranges + per-URL byte offsets of its events
+
+    Price history for a URL seeks straight to that URL's events. "State as of T" starts
+    from the newest snapshot before T and replays only the partitions after it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self._index: Optional[Dict[str, Any]] = None
+        self._pending: List[Dict[str, Any]] = []
+
+    @property
+    def index(self) -> Dict[str, Any]:
+        if self._index is None:
+            self._index = {"partitions": {}, "urls": {}}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, "r", encoding="utf-8") as f:
+                        self._index = json.load(f)
+                except Exception as e:
+                    logger.error(f"Failed to load history index: {e}")
+        return self._index
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.index["partitions"] and not self._pending
+
+    def _partition_path(self, partition: str) -> str:
+        return os.path.join(self.directory, f"events-{partition}.jsonl")
+
+    def _snapshot_path(self, partition: str) -> str:
+        return os.path.join(self.directory, f"snapshot-{partition}.json")
+
+    # Writing
+
+    def record(self, url: str, event: str, time: str, **fields):
+        """Queues an event; nothing is written until flush()."""
+        entry = {"t": time, "url": url, "e": event}
+        entry.update({k: v for k, v in fields.items() if v is not None})
+        self._pending.append(entry)
+
+    def flush(self):
+        """Appends queued events to their month partitions and updates the index."""
+        if not self._pending:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        index = self.index
+
+        by_partition: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self._pending:
+            by_partition.setdefault(entry["t"][:7], []).append(entry)
+
+        for partition, entries in sorted(by_partition.items()):
+            path = self._partition_path(partition)
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(path, "ab") as f:
+                for entry in entries:
+                    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    index["urls"].setdefault(entry["url"], []).append([partition, offset])
+                    offset += len(line)
+
+            meta = index["partitions"].setdefault(partition, {"start": entries[0]["t"], "end": entries[0]["t"], "events": 0})
+            meta["start"] = min(meta["start"], min(e["t"] for e in entries))
+            meta["end"] = max(meta["end"], max(e["t"] for e in entries))
+            meta["events"] += len(entries)
+
+        # Snapshots are cumulative, so new events invalidate the snapshot of their month and every later one
+        oldest = min(by_partition)
+        for partition, meta in index["partitions"].items():
+            if partition >= oldest:
+                meta.pop("snapshot", None)
+
+        self._save_index()
+        logger.info(f"Appended {len(self._pending)} history events.")
+        self._pending = []
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def compact(self):
+        """
+        Writes a state snapshot for every closed month (all but the newest) that lacks one,
+        so as-of queries never have to replay more than the months after the snapshot.
+        """
+        partitions = sorted(self.index["partitions"])
+        state: Dict[str, Dict[str, Any]] = {}
+        changed = False
+        for partition in partitions[:-1]:
+            meta = self.index["partitions"][partition]
+            if meta.get("snapshot"):
+                with open(self._snapshot_path(partition), "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                continue
+            for entry in self._read_partition(partition):
+                _apply(state, entry)
+            with open(self._snapshot_path(partition), "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            meta["snapshot"] = True
+            changed = True
+        if changed:
+            self._save_index()
+
+    # Reading
+
+    def _read_partition(self, partition: str):
+        path = self._partition_path(partition)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def events_for(self, url: str) -> List[Dict[str, Any]]:
+        """All events of one URL, read by seeking to the offsets in the index."""
+        events = []
+        handles = {}
+        try:
+            for partition, offset in self.index["urls"].get(url, []):
+                if partition not in handles:
+                    handles[partition] = open(self._partition_path(partition), "rb")
+                f = handles[partition]
+                f.seek(offset)
+                events.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        return sorted(events, key=lambda e: e["t"])
+
+    def price_history(self, url: str) -> List[Dict[str, Any]]:
+        """[{"t", "price", "admin_fee"}, ...] for every recorded price of a URL."""
+        return [
+            {"t": e["t"], "price": e.get("price"), "admin_fee": e.get("admin_fee")}
+            for e in self.events_for(url)
+            if "price" in e or "admin_fee" in e
+        ]
+
+    def state_as_of(self, as_of: str) -> Dict[str, Dict[str, Any]]:
+        """
+        {url: {"status", "price", "admin_fee", "first_seen", "updated"}} as it was at as_of
+        ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS"). Listings first seen after as_of are absent.
+        """
+        if len(as_of) == 10:
+            as_of += " 23:59:59"
+        partitions = sorted(self.index["partitions"])
+        state: Dict[str, Dict[str, Any]] = {}
+
+        # Start from the newest snapshot that is entirely before as_of
+        start = 0
+        for i, partition in enumerate(partitions):
+            meta = self.index["partitions"][partition]
+            if meta.get("snapshot") and meta["end"] <= as_of:
+                start = i + 1
+        if start:
+            with open(self._snapshot_path(partitions[start - 1]), "r", encoding="utf-8") as f:
+                state = json.load(f)
+
+        for partition in partitions[start:]:
+            if self.index["partitions"][partition]["start"] > as_of:
+                break
+            for entry in self._read_partition(partition):
+                if entry["t"] <= as_of:
+                    _apply(state, entry)
+        return state
+
+
+def _apply(state: Dict[str, Dict[str, Any]], entry: Dict[str, Any]):
+    current = state.setdefault(entry["url"], {"first_seen": entry["t"]})
+    current["updated"] = entry["t"]
+    for key in ("price", "admin_fee", "status"):
+        if key in entry:
+            current[key] = entry[key]
+    if entry["e"] == ENDED:
+        current["status"] = "ended"
+    elif entry["e"] in (REAPPEARED, FIRST_SEEN) and "status" not in entry:
+        current["status"] = "active"
@@ -0,0 +1,166 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from access_parser import format_station_walks
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def to_float(value: Any, default: float = 0.0) -> float:
+    """Parses the first number in a value ("11.5万円", "25.15m²", "12,000円") as float."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value) if value == value else default  # NaN check
+    match = _NUMBER.search(str(value).replace(",", ""))
+    return float(match.group()) if match else default
+
+
+def yen_to_man(value: Any) -> float:
+    """Converts a yen amount ("11000円", "-") to Man-yen, the unit used for every price column."""
+    return to_float(value) / 10000.0
+
+
+def _optional(value: Any, convert):
+    """convert(value), or None for a missing value (None or "")."""
+    return convert(value) if value not in (None, "") else None
+
+
+def normalize_station(name: str) -> str:
+    """"亀戸" / "亀戸駅" -> "亀戸駅" so every source uses the same station label."""
+    name = (name or "").strip()
+    if name and not name.endswith("駅"):
+        name += "駅"
+    return name
+
+
+@dataclass(slots=True)
+class Building:
+    """Fields shared by every room listed under one building."""
+    title: str = "Unknown"
+    address: str = ""
+    access: str = ""
+    nearest_station: str = ""
+    walk_minutes: int = 0
+    source: str = ""
+    # Geocoded from the address (see GoogleMapsClient.geocode); None until looked up
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+
+
+@dataclass(slots=True)
+class Property:
+    """
+    A single listing (room). Building-level fields are read through `building`,
+    so rooms of the same building share one Building instance.
+    Prices are Man-yen, area is m².
+    """
+    building: Building
+    url: str
+    price: float = 0.0
+    admin_fee: float = 0.0
+    layout: str = ""
+    area: float = 0.0
+    status: str = "active"
+    walking_distance_actual: Optional[float] = None
+    last_updated: Optional[str] = None
+    # Shared id of listings that are the same room (see dedup.DuplicateIndex)
+    cluster: Optional[str] = None
+    # From the detail page (see detail_parser); None until fetched
+    building_age: Optional[int] = None
+    floor: Optional[int] = None
+    deposit: Optional[float] = None
+    key_money: Optional[float] = None
+    orientation: Optional[str] = None
+
+    @property
+    def total_price(self) -> float:
+        return self.price + self.admin_fee
+
+    @property
+    def title(self) -> str:
+        return self.building.title
+
+    @property
+    def address(self) -> str:
+        return self.building.address
+
+    @property
+    def access(self) -> str:
+        return self.building.access
+
+    @property
+    def nearest_station(self) -> str:
+        return self.building.nearest_station
+
+    @property
+    def walk_minutes(self) -> int:
+        return self.building.walk_minutes
+
+    @property
+    def source(self) -> str:
+        return self.building.source
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat record in storage column order."""
+        b = self.building
+        return {
+            "status": self.status,
+            "title": b.title,
+            "total_price": self.price + self.admin_fee,
+            "price": self.price,
+            "admin_fee": self.admin_fee,
+            "layout": self.layout,
+            "area": self.area,
+            "nearest_station": b.nearest_station,
+            "walk_minutes": b.walk_minutes,
+            "walking_distance_actual": self.walking_distance_actual,
+            "address": b.address,
+            "access": b.access,
+            "url": self.url,
+            "last_updated": self.last_updated,
+            "source": b.source,
+            "cluster": self.cluster,
+            "station_walks": format_station_walks(b.access),
+            "lat": b.lat,
+            "lng": b.lng,
+            "building_age": self.building_age,
+            "floor": self.floor,
+            "deposit": self.deposit,
+            "key_money": self.key_money,
+            "orientation": self.orientation,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], building: Optional[Building] = None) -> "Property":
+        """Builds a Property from a flat record (e.g. a stored row)."""
+        if building is None:
+            building = Building(
+                title=data.get("title") or "Unknown",
+                address=data.get("address") or "",
+                access=data.get("access") or "",
+                nearest_station=data.get("nearest_station") or "",
+                walk_minutes=int(to_float(data.get("walk_minutes"))),
+                source=data.get("source") or "",
+                lat=_optional(data.get("lat"), to_float),
+                lng=_optional(data.get("lng"), to_float),
+            )
+        walking = data.get("walking_distance_actual")
+        return cls(
+            building=building,
+            url=data.get("url") or "",
+            price=to_float(data.get("price")),
+            admin_fee=to_float(data.get("admin_fee")),
+            layout=data.get("layout") or "",
+            area=to_float(data.get("area")),
+            status=data.get("status") or "active",
+            walking_distance_actual=to_float(walking) if walking not in (None, "") else None,
+            last_updated=data.get("last_updated"),
+            cluster=data.get("cluster") or None,
+            building_age=_optional(data.get("building_age"), lambda v: int(to_float(v))),
+            floor=_optional(data.get("floor"), lambda v: int(to_float(v))),
+            deposit=_optional(data.get("deposit"), to_float),
+            key_money=_optional(data.get("key_money"), to_float),
+            orientation=data.get("orientation") or None,
+        )
@@ -0,0 +1,451 @@
+"""
+The scrape pipeline: search every site, deduplicate, enrich, verify and store, then
+render the static pages. main.py imports this only for commands that scrape, so
+read-only commands don't load the scrapers (playwright, bs4) or pandas.
+"""
+import asyncio
+import logging
+import os
+
+from config import (SEARCH_CONDITIONS, SEARCH_CONDITIONS_PATH, PAGE_COLUMNS, FULL_SWEEP_INTERVAL_HOURS,
+                    SCRAPE_STATE_PATH, MAX_CONNECTIONS_PER_HOST, DETAIL_PAGES_ENABLED)
+from buildings import group_buildings
+from text_index import TextIndex, page_postings, page_texts
+from dedup import STORED_COLUMNS, DuplicateIndex, merge_records
+from scrape_state import ScrapeState
+from search_profiles import ProfileFilter, load_profiles, page_path, union_conditions
+from scrapers.registry import ScraperRegistry
+from scrapers.rate_control import rate_control
+from utils import extract_station_name
+from access_parser import StationMatcher
+from run_report import metrics
+import run_journal
+from run_journal import journal
+
+logger = logging.getLogger(__name__)
+
+def run_scrape(csv_manager, gmaps_client, conditions, force_recalc=False, full_sweep=False, resume=False):
+    """
+    Blocking entry point. The pipeline runs on one event loop so requests to all sites overlap.
+    Completed steps are journaled as they happen; resume=True skips the ones an interrupted
+    run already did. The journal is removed once the run has been written out.
+    """
+    journal.start(conditions, resume=resume)
+    try:
+        asyncio.run(run_scrape_async(csv_manager, gmaps_client, conditions, force_recalc, full_sweep))
+    except BaseException:
+        # Keep the journal for --resume
+        journal.close()
+        raise
+    journal.finish()
+
+async def run_scrape_async(csv_manager, gmaps_client, conditions, force_recalc=False, full_sweep=False,
+                           registry=None, state=None, check_missing=True, write=True, verify_results=True):
+    """
+    One scrape cycle. Returns (properties found, sources that were fully swept).
+    Search, detail pages and verification use the scrapers of one ScraperRegistry, so they
+    share connections and browsers. Long-running callers (the daemon) pass their own open
+    registry and state so those stay warm between cycles, and do the availability checks
+    (verify_results=False, check_missing=False) and writes themselves.
+    """
+    logger.info("Starting scrape...")
+    owns_registry = registry is None
+    if owns_registry:
+        registry = await ScraperRegistry().open()
+    scrapers = registry.search_scrapers()
+    
+    # Walking distances already stored, keyed by URL
+    known_walks = csv_manager.get_field_map("walking_distance_actual")
+
+    state = state or ScrapeState(SCRAPE_STATE_PATH)
+    # Sources whose whole result set was fetched; only their missing listings can be judged ended
+    swept_sources = set()
+
+    try:
+        # Every source is searched concurrently
+        results = await asyncio.gather(*(
+            search_source(scraper, conditions, csv_manager, state, full_sweep, swept_sources)
+            for scraper in scrapers
+        ))
+        all_properties = [p for properties in results for p in properties]
+
+        # The same room is often listed on several sites / by several agents.
+        # Cluster the copies so each room is enriched and verified once.
+        # Stored listings take part too: an incremental search may skip the copy a new one duplicates.
+        with metrics.stage("dedup"):
+            index = DuplicateIndex(known_clusters=csv_manager.get_field_map("cluster"))
+            found_urls = {p.url for p in all_properties}
+            for record in csv_manager.get_all_properties(columns=STORED_COLUMNS + ["status"]):
+                if record.get("status") == "active" and record["url"] not in found_urls:
+                    index.add_stored(record)
+            index.add_all(all_properties)
+            clusters = index.clusters()
+        metrics.incr("dedup.clusters", len(clusters))
+        metrics.incr("dedup.stored_matches", sum(1 for members in clusters if index.stored_copies(members[0].cluster)))
+        metrics.incr("dedup.duplicates", len(all_properties) - len(clusters))
+
+        # Then calculate walking distance for one listing per cluster
+        with metrics.stage("walking_time"):
+            for members in clusters:
+                # A stored copy's walk is this room's walk
+                if not any(known_walks.get(p.url) for p in members):
+                    walks = [known_walks[r["url"]] for r in index.stored_copies(members[0].cluster) if known_walks.get(r["url"])]
+                    if walks:
+                        known_walks[members[0].url] = walks[0]
+            representatives = [pick_representative(c, known_walks) for c in clusters]
+            await enrich_walking_time_async(representatives, known_walks, gmaps_client, force_recalc)
+            for rep, members in zip(representatives, clusters):
+                for p in members:
+                    p.walking_distance_actual = rep.walking_distance_actual
+
+        # Position of each building, for distance queries (commute_index)
+        with metrics.stage("geocode"):
+            await enrich_coordinates_async(all_properties, csv_manager, gmaps_client)
+
+        # Detail pages of new listings; a fetch also tells whether the listing is still up
+        availability = {}
+        if DETAIL_PAGES_ENABLED:
+            with metrics.stage("details"):
+                details = registry.context.details
+                await enrich_details_async(registry, clusters, details, availability)
+                details.save()
+
+        # Verify availability of each room (to catch stale search results)
+        # This is slower but ensures accuracy
+        if verify_results:
+            with metrics.stage("verification"):
+                await verify_search_results(registry, clusters, availability)
+
+        # 1. Save new/updated properties (applied in memory; written when the batch ends)
+        with metrics.stage("csv_save"):
+            if all_properties:
+                logger.info(f"Saving {len(all_properties)} properties to CSV...")
+                csv_manager.save_properties(all_properties)
+            else:
+                logger.info("No new properties found in this scrape.")
+        metrics.incr("properties.saved", len(all_properties))
+
+        # 2. Check for "Listing Ended" properties
+        # (an incremental search doesn't see older listings, so their absence means nothing)
+        if check_missing:
+            with metrics.stage("verify_missing"):
+                await verify_missing_listings(csv_manager, all_properties, registry, swept_sources)
+    finally:
+        if owns_registry:
+            await registry.close()
+
+    # 3. Write the store back once
+    if write:
+        with metrics.stage("csv_write"):
+            csv_manager.flush()
+            if csv_manager.history is not None:
+                csv_manager.history.compact()
+            state.save()
+            rate_control.save()
+    return all_properties, swept_sources
+
+async def search_source(scraper, conditions, csv_manager, state, full_sweep, swept_sources):
+    """Searches one site (incrementally when possible) and applies the station filter."""
+    try:
+        source = scraper.source_name
+        incremental = (scraper.supports_incremental and not full_sweep
+                       and not state.full_sweep_due(source, FULL_SWEEP_INTERVAL_HOURS))
+        known_urls = None
+        if incremental:
+            known_urls = state.seen_urls(source) | csv_manager.get_urls(source)
+            logger.info(f"Incremental search for {source} ({len(known_urls)} known listings)")
+
+        logger.info(f"Running {source} scraper with conditions: {conditions}")
+        # Filter by Station FIRST, as listings stream in: a wide (ward-level) search only
+        # keeps the matches in memory, not every result
+        station_match = station_filter(conditions)
+        seen_urls = []
+        properties = []
+        with metrics.stage(f"search:{source}"):
+            async for p in scraper.search_stream(conditions, known_urls=known_urls):
+                seen_urls.append(p.url)
+                if station_match(p):
+                    properties.append(p)
+        metrics.incr(f"properties.scraped.{source}", len(seen_urls))
+        metrics.incr("search.incremental" if incremental else "search.full_sweep")
+        logger.info(f"Filtered {len(seen_urls)} -> {len(properties)} {source} properties by station.")
+
+        if scraper.supports_incremental:
+            state.record_search(source, seen_urls, full_sweep=not incremental)
+        if not incremental:
+            swept_sources.add(source)
+        return properties
+    except Exception as e:
+        logger.error(f"Error in {scraper.source_name} scraper: {e}")
+        return []
+
+def station_filter(conditions):
+    """Predicate for listings near the configured stations (every listing passes if none are set)."""
+    if "stations" in conditions and conditions["stations"]:
+        # One precompiled pattern for all stations; matches "/月島駅" (SUUMO) and "「月島」駅" (AtHome)
+        matcher = StationMatcher(conditions["stations"])
+        return lambda p: matcher.matches(p.access)
+    return lambda p: True
+
+def pick_representative(members, known_walks):
+    """Prefers a listing whose walking time is already known, so the cluster needs no lookup."""
+    for p in members:
+        if known_walks.get(p.url):
+            return p
+    return members[0]
+
+def enrich_walking_time(properties, known_walks, gmaps_client, force_recalc=False):
+    for p in properties:
+        url = p.url
+        # Check if we already have this property and it has walking_distance_actual
+        # SKIP this check if --force-recalc is set
+        if not force_recalc and known_walks.get(url):
+            p.walking_distance_actual = known_walks[url]
+            logger.info(f"Using cached walking distance for {p.title}")
+            metrics.incr("walking_time.reused")
+            continue
+
+        # If not, use API to get it
+        station_name = extract_station_name(p.access or p.nearest_station)
+        address = p.address
+        title = p.title
+        
+        if station_name and address:
+            # Clean station name (remove line name if present)
+            if "/" in station_name:
+                station_name = station_name.split("/")[1]
+            
+            # Disambiguate specific stations
+            # Kikukawa Station exists in other prefectures (e.g. Shizuoka), causing huge walking times.
+            if station_name == "菊川駅":
+                station_name = "東京都江東区 菊川駅"
+            
+            # Determine Origin: Title or Address
+            # User Rule: If title contains "{StationName}駅", it's likely a generic name -> Use Address
+            # Otherwise -> Use Title (Building Name)
+            
+            # Note: station_name usually doesn't have "駅" suffix in our extraction, 
+            # but let's check if the title has the station name followed by "駅"
+            # Actually, extract_station_name usually returns "木場" or "木場駅"? 
+            # Let's assume it returns "木場".
+            
+            check_station_str = station_name if station_name.endswith("駅") else f"{station_name}駅"
+            
+            if check_station_str in title:
+                origin = address
+                logger.info(f"Origin decision: Address (Generic title '{title}' contains '{check_station_str}')")
+            else:
+                # Use Title, but maybe append address for uniqueness? 
+                # User asked for "Building Name", but Google Maps might find a different building with same name.
+                # Let's try "Title (Address)" format or just "Title".
+                # User said "建物名から最寄り駅で検索". Let's use Title.
+                # But to be safe, let's use "Title" combined with "Address" if possible? 
+                # No, strictly follow request: "建物名から"
+                origin = title
+                logger.info(f"Origin decision: Building Name ('{title}')")
+
+            logger.info(f"Calculating walking distance for {p.title} ({origin} -> {station_name})")
+            walk_minutes = gmaps_client.get_walking_time(origin, station_name)
+            if walk_minutes > 0:
+                p.walking_distance_actual = walk_minutes
+            else:
+                p.walking_distance_actual = None
+
+async def enrich_coordinates_async(properties, csv_manager, gmaps_client):
+    """Sets building lat/lng: from the store when known, else geocoded once per address."""
+    known_lat = csv_manager.get_field_map("lat")
+    known_lng = csv_manager.get_field_map("lng")
+    by_address = {}
+    for p in properties:
+        if p.url in known_lat and p.url in known_lng:
+            p.building.lat, p.building.lng = known_lat[p.url], known_lng[p.url]
+        elif p.address:
+            by_address.setdefault(p.address, []).append(p)
+    semaphore = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+
+    async def geocode(address, members):
+        async with semaphore:
+            location = await asyncio.to_thread(gmaps_client.geocode, address)
+        if location:
+            for p in members:
+                p.building.lat, p.building.lng = location
+
+    await asyncio.gather(*(geocode(address, members) for address, members in by_address.items()))
+
+async def enrich_walking_time_async(properties, known_walks, gmaps_client, force_recalc=False):
+    """Runs enrich_walking_time per property in worker threads (the Maps client is blocking)."""
+    semaphore = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+
+    async def enrich(p):
+        found, minutes = journal.lookup(run_journal.WALK, p.url)
+        if found:
+            p.walking_distance_actual = minutes
+            return
+        async with semaphore:
+            await asyncio.to_thread(enrich_walking_time, [p], known_walks, gmaps_client, force_recalc)
+        journal.record(run_journal.WALK, p.url, p.walking_distance_actual)
+
+    await asyncio.gather(*(enrich(p) for p in properties))
+
+async def enrich_details_async(registry, clusters, details, availability):
+    """
+    Sets the detail-page fields of every cluster from the cache, fetching the pages of
+    listings not cached yet (concurrently; pacing is per host). Whether each fetched
+    listing is still up goes into `availability` ({url: active}) for the verification.
+    """
+    async def enrich(members):
+        p = members[0]
+        fields = details.get(p.url)
+        scraper = registry.get(p.source)
+        if fields is not None:
+            metrics.incr("details.cached")
+        elif scraper:
+            try:
+                active, fields = await scraper.fetch_detail_async(p.url, p.price)
+            except Exception as e:
+                logger.error(f"Error fetching details of {p.url}: {e}")
+                return
+            metrics.incr("details.fetched")
+            availability[p.url] = active
+            if active:
+                details.put(p.url, fields)
+        for m in members:
+            for field, value in (fields or {}).items():
+                setattr(m, field, value)
+
+    await asyncio.gather(*(enrich(members) for members in clusters))
+
+async def verify_search_results(registry, clusters, availability=None):
+    """
+    Checks one listing per cluster (all clusters concurrently). Listings in `availability`
+    were fetched moments ago (detail pages) and aren't fetched again.
+    If the listing has ended, the other copies are checked too: identical rooms of one
+    building can end up in one cluster, so one copy's check doesn't end the others.
+    """
+    async def check(p):
+        """Whether the listing is still up; None if no scraper can tell."""
+        url = p.url
+        scraper = registry.get(p.source)
+        if not url or not scraper:
+            return None
+        found, is_active = journal.lookup(run_journal.VERIFIED, url)
+        if not found:
+            if availability and url in availability:
+                metrics.incr("verification.reused")
+                is_active = availability[url]
+            else:
+                metrics.incr("verification.checked")
+                is_active = await scraper.check_availability_async(url)
+            journal.record(run_journal.VERIFIED, url, is_active)
+        if not is_active:
+            logger.warning(f"Property in search results but ended: {p.title} ({url})")
+            metrics.incr("verification.ended")
+            p.status = 'ended'
+        return is_active
+
+    async def verify(members):
+        if await check(members[0]) is False:
+            await asyncio.gather(*(check(m) for m in members[1:]))
+
+    await asyncio.gather(*(verify(members) for members in clusters))
+
+async def verify_missing_listings(csv_manager, all_properties, registry, sources=None):
+    # Logic: Properties in CSV that are 'active' but NOT in all_properties (the new scrape result)
+    # might be ended. We should verify them.
+    
+    existing_props = csv_manager.get_all_properties()
+    new_urls = set(p.url for p in all_properties)
+    
+    # Candidates for checking: Active in CSV but not in New Scrape
+    candidates = [p for p in existing_props if p.get('status') == 'active' and p.get('url') not in new_urls
+                  and (sources is None or p.get('source') in sources)]
+
+    # Copies of one room are checked once while it is active; once one has ended, the
+    # others are checked on their own (a cluster may hold identical rooms of one building)
+    cluster_members = {}
+    for p in candidates:
+        cluster_members.setdefault(p.get('cluster') or p.get('url'), []).append(p)
+    candidates = [members[0] for members in cluster_members.values()]
+    
+    if candidates:
+        logger.info(f"Checking status of {len(candidates)} properties missing from search result...")
+
+        async def verify(p):
+            url = p.get('url')
+            source = p.get('source')
+            # The scrapers of the search, with their open connections
+            scraper = registry.get(source)
+            if not scraper:
+                logger.warning(f"No scraper found for source {source}, skipping verification for {url}")
+                return p, None
+            found, is_active = journal.lookup(run_journal.MISSING, url)
+            if not found:
+                logger.info(f"Verifying: {p.get('title')} ({url})")
+                metrics.incr("verify_missing.checked")
+                is_active = await scraper.check_availability_async(url)
+                journal.record(run_journal.MISSING, url, is_active)
+            return p, is_active
+
+        # All checks run concurrently; statuses are applied afterwards
+        results = await asyncio.gather(*(verify(p) for p in candidates if p.get('url')))
+        copies = [m for p, is_active in results if is_active is False
+                  for m in cluster_members[p.get('cluster') or p.get('url')][1:]]
+        results += await asyncio.gather(*(verify(m) for m in copies))
+
+        for p, is_active in results:
+            url = p.get('url')
+            if is_active is False:
+                logger.info(f"-> Listing Ended: {url}. Updating status.")
+                metrics.incr("verify_missing.ended")
+                csv_manager.update_status(url, "ended")
+            elif is_active:
+                logger.info(f"-> Still Active (maybe conditions changed or rank dropped): {url}")
+                # Optionally update timestamp to show we checked?
+                # csv_manager.update_status(url, "active") 
+    else:
+        logger.info("No properties need status verification.")
+
+def generate_html(csv_manager, output_path='index.html', profiles=None):
+    """
+    Generates a static index.html from the CSV data. With several search profiles,
+    also writes index-<name>.html per profile with only its matching listings.
+    """
+    try:
+        from jinja2 import Environment, FileSystemLoader
+        import os
+        
+        env = Environment(loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')))
+        template = env.get_template('index.html')
+        
+        if profiles is None:
+            profiles = load_profiles(SEARCH_CONDITIONS_PATH, SEARCH_CONDITIONS)
+
+        # Every page is rendered from the same read of the store
+        records = csv_manager.get_all_properties(columns=PAGE_COLUMNS)
+        # The search index and the profile filters need the access text, which the page itself doesn't
+        access = csv_manager.get_field_map("access")
+        searchable = {r["url"]: dict(r, access=access.get(r["url"])) for r in records}
+        index = TextIndex.build(searchable.values())
+        pages = [(output_path, union_conditions(profiles).get("stations", []), records)]
+        if len(profiles) > 1:
+            ages = csv_manager.get_field_map("building_age")
+            for name, conditions in profiles.items():
+                profile_filter = ProfileFilter(conditions)
+                matching = [r for r in records
+                            if profile_filter.matches(dict(r, access=access.get(r["url"]), building_age=ages.get(r["url"])))]
+                metrics.incr(f"profile.{name}.listings", len(matching))
+                pages.append((page_path(name, output_path), conditions.get("stations", []), matching))
+
+        for path, priority_stations, page_records in pages:
+            properties = merge_records(page_records)
+            groups = group_buildings(properties)
+            search_index = page_postings(index, groups)
+            html_content = template.render(groups=groups, priority_stations=priority_stations, search_index=search_index,
+                                           search_texts=page_texts(groups, searchable))
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+
+            logger.info(f"Generated static {path} with {len(properties)} properties in {len(groups)} buildings.")
+    except Exception as e:
+        logger.error(f"Failed to generate HTML: {e}")
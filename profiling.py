@@ -0,0 +1,164 @@
+import cProfile
+import logging
+import os
+import pstats
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from run_report import metrics
+
+logger = logging.getLogger(__name__)
+
+# Allocations are grouped by source line, so one frame per traceback is enough and keeps snapshots cheap
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATORS = 15
+
+
+class RunProfiler:
+    """
+    Wraps a run with cProfile and tracemalloc.
+    Hooks into run_report stages so every pipeline stage gets its own memory delta,
+    peak and top allocators. Stages that run at the same time (the concurrent
+    search:<source> stages) share one snapshot and peak: they are measured together,
+    from the first start to the last finish, and reported as one overlapping entry.
+
+    cProfile only sees the thread it runs in (the event loop's): work run through
+    asyncio.to_thread (Maps lookups, requests without aiohttp) and in the parse workers
+    is not in the CPU profile. On exit it writes into output_dir:
+      - profile.pstats     (load with pstats / snakeviz / flameprof)
+      - profile.folded     (collapsed stacks for flamegraph.pl / speedscope)
+      - profile_summary.txt (top functions and allocators per stage)
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.profiler = cProfile.Profile()
+        # Stages running now, and every stage measured by the current snapshot
+        self._open: List[str] = []
+        self._group: List[str] = []
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self.stage_memory: List[Dict] = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        metrics.stage_listeners.append(self)
+        self.profiler.enable()
+        logger.info(f"Profiling enabled. Output: {self.output_dir}")
+
+    def stop(self):
+        self.profiler.disable()
+        if self in metrics.stage_listeners:
+            metrics.stage_listeners.remove(self)
+        overall = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self._write(overall, peak)
+
+    # Stage listener interface (called by run_report.metrics.stage).
+    # Snapshot bookkeeping is kept out of the CPU profile so it doesn't drown the pipeline's own costs.
+
+    def stage_started(self, name: str):
+        self._open.append(name)
+        if name not in self._group:
+            self._group.append(name)
+        if len(self._open) > 1:
+            # Measured together with the stages already running
+            return
+        self.profiler.disable()
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+        self.profiler.enable()
+
+    def stage_finished(self, name: str):
+        if name in self._open:
+            self._open.remove(name)
+        if self._open or self._before is None:
+            return
+        before, self._before = self._before, None
+        group, self._group = self._group, []
+        self.profiler.disable()
+        current, peak = tracemalloc.get_traced_memory()
+        diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        self.stage_memory.append({
+            "stage": " + ".join(group),
+            "overlapping": len(group) > 1,
+            "allocated": sum(d.size_diff for d in diff),
+            "current": current,
+            "peak": peak,
+            "top": [(str(d.traceback), d.size_diff, d.count_diff) for d in diff[:TOP_ALLOCATORS]],
+        })
+        self.profiler.enable()
+
+    def _write(self, overall: tracemalloc.Snapshot, peak: int):
+        stats_path = os.path.join(self.output_dir, "profile.pstats")
+        self.profiler.dump_stats(stats_path)
+        stats = pstats.Stats(stats_path)
+
+        with open(os.path.join(self.output_dir, "profile.folded"), "w", encoding="utf-8") as f:
+            for stack, weight in folded_stacks(stats):
+                f.write(f"{stack} {weight}\n")
+
+        summary_path = os.path.join(self.output_dir, "profile_summary.txt")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n\n")
+
+            f.write("== Stages ==\n")
+            for entry in self.stage_memory:
+                overlap = " (overlapping, measured together)" if entry["overlapping"] else ""
+                f.write(f"{entry['stage']}{overlap}: allocated {entry['allocated'] / 1024:+.0f} KiB, "
+                        f"current {entry['current'] / 1024 / 1024:.1f} MiB, peak {entry['peak'] / 1024 / 1024:.1f} MiB\n")
+                for where, size, count in entry["top"]:
+                    f.write(f"    {size / 1024:+10.1f} KiB {count:+8d} blocks  {where}\n")
+            f.write("\n")
+
+            f.write("== Top allocators at exit ==\n")
+            for stat in overall.statistics("lineno")[:TOP_ALLOCATORS]:
+                f.write(f"    {stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {stat.traceback}\n")
+            f.write("\n")
+
+            f.write("== Top functions by cumulative time ==\n")
+            stats.stream = f
+            stats.sort_stats("cumulative").print_stats(40)
+
+        logger.info(f"Wrote profile to {stats_path} and {summary_path}")
+
+
+def folded_stacks(stats: pstats.Stats) -> List[Tuple[str, int]]:
+    """
+    Approximates collapsed stacks from cProfile data, which only records caller->callee edges.
+    Each function's own time is attributed to the chain of its heaviest callers up to a root.
+    Weights are microseconds.
+    """
+    raw = stats.stats  # func -> (cc, nc, tottime, cumtime, callers)
+
+    def label(func) -> str:
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":").replace(" ", "_")
+
+    folded = []
+    for func, (_, _, tottime, _, callers) in raw.items():
+        weight = int(tottime * 1_000_000)
+        if weight <= 0:
+            continue
+        chain = [label(func)]
+        seen = {func}
+        current_callers = callers
+        while current_callers:
+            # callers maps caller -> (cc, nc, tottime, cumtime) for this edge
+            parent = max(current_callers, key=lambda c: current_callers[c][3])
+            if parent in seen:
+                break
+            seen.add(parent)
+            chain.append(label(parent))
+            current_callers = raw.get(parent, (0, 0, 0, 0, {}))[4]
+        folded.append((";".join(reversed(chain)), weight))
+    return folded
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import config
+from run_report import metrics
+
+logger = logging.getLogger(__name__)
+
+# Entry kinds
+PAGE = "page"          # search result page HTML, keyed by URL
+WALK = "walk"          # walking time found for a listing, keyed by URL
+VERIFIED = "verified"  # availability of a listing from the search results, keyed by URL
+MISSING = "missing"    # availability of a stored listing missing from the results, keyed by URL
+FINISHED = "finished"  # the run completed; nothing to resume
+
+
+class RunJournal:
+    """
+    JSON-lines journal of the work a scrape run has completed: fetched result pages,
+    walking times and availability checks. Every entry is appended and flushed as
+    soon as it is known, so a cancelled or crashed run leaves a usable journal.
+
+    start(resume=True) loads a previous run's journal (if it was for the same search
+    conditions) and lookup() then answers from it instead of redoing the work.
+    Once a run completes, its journal is replaced by a single "finished" entry, which
+    start() never resumes from. A copy kept elsewhere (the CI cache) is then superseded
+    by the finished one rather than restored again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.active = False
+        self._entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    @staticmethod
+    def _fingerprint(conditions: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(conditions, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def start(self, conditions: Dict[str, Any], resume: bool = False):
+        fingerprint = self._fingerprint(conditions)
+        self._entries = {}
+        if resume:
+            self._load(fingerprint)
+        else:
+            self.discard()
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not self._entries:
+            self._write({"kind": "run", "conditions": fingerprint, "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        self.active = True
+
+    def _load(self, fingerprint: str):
+        if not os.path.exists(self.path):
+            logger.info("No run journal to resume from. Starting a fresh run.")
+            return
+        entries = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of a killed run may be incomplete
+                    continue
+                if entry["kind"] == FINISHED:
+                    logger.info("The last run finished. Starting a fresh run.")
+                    self.discard()
+                    return
+                if entry["kind"] == "run":
+                    if entry["conditions"] != fingerprint:
+                        logger.warning("Run journal was written for different search conditions. Starting a fresh run.")
+                        self.discard()
+                        return
+                    started = datetime.strptime(entry["started"], "%Y-%m-%d %H:%M:%S")
+                    if datetime.now() - started > timedelta(hours=config.RUN_JOURNAL_MAX_AGE_HOURS):
+                        logger.warning(f"Run journal from {entry['started']} is too old to resume. Starting a fresh run.")
+                        self.discard()
+                        return
+                    continue
+                entries[f"{entry['kind']}:{entry['key']}"] = entry["value"]
+        self._entries = entries
+        logger.info(f"Resuming from run journal with {len(entries)} completed steps.")
+
+    def _write(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def lookup(self, kind: str, key: str) -> Tuple[bool, Optional[Any]]:
+        """(True, value) if this step was completed by the journaled run."""
+        if not self.active:
+            return False, None
+        full_key = f"{kind}:{key}"
+        if full_key in self._entries:
+            metrics.incr(f"journal.reused.{kind}")
+            return True, self._entries[full_key]
+        return False, None
+
+    def record(self, kind: str, key: str, value: Any):
+        if not self.active:
+            return
+        # Page HTML only goes to disk: this run never looks it up again, and keeping
+        # every page in memory would grow with the size of the search
+        if kind != PAGE:
+            self._entries[f"{kind}:{key}"] = value
+        self._write({"kind": kind, "key": key, "value": value})
+
+    def close(self):
+        self.active = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Removes the journal file (the run finished, or its journal can't be reused)."""
+        self._entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def finish(self):
+        """Marks the run as completed: the journal keeps only a FINISHED entry."""
+        self.close()
+        self._entries = {}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": FINISHED, "finished": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+journal = RunJournal(config.RUN_JOURNAL_PATH)
@@ -0,0 +1,125 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the request latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.status_codes: Dict[str, int] = {}
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, status: int, nbytes: int, seconds: float):
+        self.requests += 1
+        self.bytes += nbytes
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        code = str(status) if status else "error"
+        self.status_codes[code] = self.status_codes.get(code, 0) + 1
+        if not status or status >= 400:
+            self.errors += 1
+
+        ms = seconds * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.latency_histogram[i] += 1
+                break
+        else:
+            self.latency_histogram[-1] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "avg_latency_ms": round(self.total_seconds / self.requests * 1000, 1) if self.requests else None,
+            "max_latency_ms": round(self.max_seconds * 1000, 1),
+            "status_codes": self.status_codes,
+            "latency_histogram": dict(zip(labels, self.latency_histogram)),
+        }
+
+
+class RunReport:
+    """
+    Collects per-stage timings, counters and per-host request statistics for one run,
+    and writes them as a JSON report.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Objects with stage_started(name)/stage_finished(name), e.g. the profiler
+        self.stage_listeners: List[Any] = []
+        self.reset()
+
+    def reset(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {}
+        self.hosts: Dict[str, HostStats] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times a pipeline stage. Repeated stages with the same name are accumulated."""
+        for listener in self.stage_listeners:
+            listener.stage_started(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                entry["seconds"] += elapsed
+                entry["calls"] += 1
+            for listener in self.stage_listeners:
+                listener.stage_finished(name)
+            logger.debug(f"Stage {name} took {elapsed:.2f}s")
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_request(self, url: str, status: int, nbytes: int, seconds: float):
+        host = urlparse(url).netloc or url
+        with self._lock:
+            self.hosts.setdefault(host, HostStats()).add(status, nbytes, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.counters.get("route_cache.hit", 0)
+            misses = self.counters.get("route_cache.miss", 0)
+            return {
+                "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "total_seconds": round(time.perf_counter() - self._start, 3),
+                "stages": {name: {"seconds": round(s["seconds"], 3), "calls": s["calls"]} for name, s in self.stages.items()},
+                "counters": dict(sorted(self.counters.items())),
+                "route_cache_hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+                "hosts": {host: stats.to_dict() for host, stats in sorted(self.hosts.items())},
+            }
+
+    def write(self, path: str):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            logger.info(f"Wrote run report to {path}")
+        except Exception as e:
+            logger.error(f"Failed to write run report: {e}")
+
+
+metrics = RunReport()
@@ -0,0 +1,52 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ScrapeState:
+    """
+    Per-source bookkeeping for incremental searches, persisted between runs:
+      - when the last full sweep finished
+      - every URL seen in search results since then (including ones the station
+        filter dropped, which never reach the store but still count as "known")
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.sources = json.load(f).get("sources", {})
+            except Exception as e:
+                logger.error(f"Failed to load scrape state: {e}")
+
+    def full_sweep_due(self, source: str, interval_hours: float) -> bool:
+        last = self.sources.get(source, {}).get("last_full_sweep")
+        if not last:
+            return True
+        return datetime.now() - datetime.strptime(last, TIME_FORMAT) >= timedelta(hours=interval_hours)
+
+    def seen_urls(self, source: str) -> Set[str]:
+        return set(self.sources.get(source, {}).get("seen_urls", []))
+
+    def record_search(self, source: str, urls: Iterable[str], full_sweep: bool):
+        """A full sweep replaces the seen set (dropping delisted URLs); incremental runs add to it."""
+        entry = self.sources.setdefault(source, {})
+        seen = set(urls) if full_sweep else self.seen_urls(source) | set(urls)
+        entry["seen_urls"] = sorted(seen)
+        if full_sweep:
+            entry["last_full_sweep"] = datetime.now().strftime(TIME_FORMAT)
+
+    def save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"sources": self.sources}, f, ensure_ascii=False, indent=1)
+        except Exception as e:
+            logger.error(f"Failed to save scrape state: {e}")
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from .http_archive import archive, ArchivedResponse
+from .rate_control import HostLimiter, rate_control
+from run_report import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHttpClient:
+    """
+    Async GET through the record/replay archive. Concurrency and pacing per host
+    are set by rate_control, which adapts them to how the site responds.
+
+    Uses aiohttp when installed; otherwise each request runs requests.get in a worker
+    thread, which still overlaps the network waits. Responses are ArchivedResponse
+    objects either way, and transport errors surface as requests exceptions so
+    callers keep a single error type.
+    """
+
+    def __init__(self):
+        self._session = None
+
+    def semaphore(self, url: str) -> HostLimiter:
+        """Per-host limit, shared by HTTP requests and browser pages of that host."""
+        return rate_control.limiter(url)
+
+    async def _download(self, url: str, headers: Optional[Dict[str, str]]) -> ArchivedResponse:
+        if aiohttp is None:
+            response = await asyncio.to_thread(requests.get, url, headers=headers)
+            return ArchivedResponse.from_response(response)
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        try:
+            async with self._session.get(url, headers=headers) as response:
+                return ArchivedResponse(str(response.url), response.status, await response.text())
+        except aiohttp.ClientError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> ArchivedResponse:
+        async with self.semaphore(url):
+            start = time.perf_counter()
+            started = time.monotonic()
+            status = 0
+            nbytes = 0
+            try:
+                data = await archive.fetch_async("http", url, lambda: self._download_dict(url, headers))
+                response = ArchivedResponse.from_dict(data)
+                status = response.status_code
+                nbytes = len(response.content)
+                return response
+            finally:
+                seconds = time.perf_counter() - start
+                metrics.record_request(url, status, nbytes, seconds)
+                rate_control.record(url, status, seconds, started)
+
+    async def _download_dict(self, url: str, headers: Optional[Dict[str, str]]) -> dict:
+        return (await self._download(url, headers)).to_dict()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,18 +1,25 @@
-import re
-import requests
 from bs4 import BeautifulSoup
 import logging
+import asyncio
 import time
-from typing import List, Dict, Any
-from playwright.sync_api import sync_playwright
-from .stealth_wrapper import stealth_sync
-from .base_scraper import BaseScraper
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Set
+from .stealth_wrapper import stealth_async
+from .base_scraper import BaseScraper, BrowserScraper
+from .http_archive import archive
+from .context import ScraperContext
+from .parse_pool import parse_pool
+from .registry import register
+from models import Building, Property, normalize_station, to_float, yen_to_man
+from run_report import metrics
+import run_journal
+from run_journal import journal
+from access_parser import primary_route
 
 logger = logging.getLogger(__name__)
 
 class AtHomeScraper(BaseScraper):
     def __init__(self):
-        super().__init__("AtHome")
+        super().__init__()
         self.base_url = "https://www.athome.co.jp/chintai/"
 
     def search(self, conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -25,18 +32,22 @@ class AtHomeScraper(BaseScraper):
     # First, add import re at the top.
     pass
 
-class AtHomeScraper(BaseScraper):
-    def __init__(self):
-        super().__init__("AtHome")
+@register
+class AtHomeScraper(BrowserScraper):
+    source_name = "AtHome"
+    browser_name = "firefox"
+
+    def __init__(self, context: Optional[ScraperContext] = None):
+        super().__init__(context)
         self.base_url = "https://www.athome.co.jp/chintai/"
+        # List pages searched, relative to base_url: the wards of the target stations
+        # (月島, 新富町 and others are in Chuo-ku, like SUUMO's sc=13102)
+        self.list_paths = ["tokyo/koto-city/list/", "tokyo/chuo-city/list/"]
 
-    def search(self, conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def search_stream(self, conditions: Dict[str, Any], known_urls: Optional[Set[str]] = None) -> AsyncIterator[Property]:
         """
         Searches for properties on at HOME using Playwright.
         """
-        # Example URL for Koto-ku
-        url = "https://www.athome.co.jp/chintai/tokyo/koto-city/list/"
-        
         params = []
         # Price (Rent)
         if 'rent' in conditions:
@@ -46,51 +57,84 @@ class AtHomeScraper(BaseScraper):
             if 'max' in rent_cond and rent_cond['max'] > 0:
                 params.append(f"PRMAX={rent_cond['max']}")
         
-        if params:
-            url += "?" + "&".join(params)
+        query = "?" + "&".join(params) if params else ""
+
+        # List pages render concurrently in one browser (bounded by the per-host limit),
+        # are parsed as they arrive (in worker processes, see parse_pool) and passed on in order
+        urls = [f"{self.base_url}{path}{query}" for path in self.list_paths]
+        pages = [asyncio.ensure_future(self._fetch_and_parse(url)) for url in urls]
+        try:
+            for page in pages:
+                for p in await page:
+                    yield p
+        finally:
+            for page in pages:
+                page.cancel()
+
+    async def _fetch_and_parse(self, url: str) -> List[Property]:
+        html = await self._fetch_list_page(url)
+        return await parse_pool.parse(self, html) if html else []
+
+    async def _fetch_list_page(self, url: str) -> str:
+        found, html = journal.lookup(run_journal.PAGE, url)
+        if found:
+            return html
 
         logger.info(f"Fetching {url} with Playwright...")
-        properties = []
-        
+        html = ""
+        start = time.perf_counter()
         try:
-            with sync_playwright() as p:
-                # Launch browser
-                # Try Firefox
-                browser = p.firefox.launch(headless=True)
-                context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/115.0",
-                    viewport={"width": 1280, "height": 800}
-                )
-                page = context.new_page()
-                
+            html = await archive.fetch_async("browser", url, lambda: self._render_page_async(url))
+            journal.record(run_journal.PAGE, url, html)
+            return html
+        except Exception as e:
+            logger.error(f"Error fetching AtHome data with Playwright: {e}")
+            return ""
+        finally:
+            metrics.record_request(url, 200 if html else 0, len(html.encode("utf-8")), time.perf_counter() - start)
+
+    async def _launch_browser(self, playwright):
+        # Try Firefox
+        return await playwright.firefox.launch(headless=True)
+
+    async def _render_page_async(self, url: str) -> str:
+        """Loads the list page in its own stealth browser context and returns the rendered HTML."""
+        browser = await self.get_browser()
+        async with self.http.semaphore(url):
+            metrics.incr("playwright.pages")
+            context = await browser.new_context(
+                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/115.0",
+                viewport={"width": 1280, "height": 800}
+            )
+            try:
+                page = await context.new_page()
+
                 # Apply stealth
-                stealth_sync(page)
-                
+                await stealth_async(page)
+
                 # Navigate to top page first
                 logger.info("Visiting top page...")
-                page.goto("https://www.athome.co.jp/", timeout=60000)
-                page.wait_for_timeout(5000)
-                
+                await page.goto("https://www.athome.co.jp/", timeout=60000)
+                await page.wait_for_timeout(5000)
+
                 # Navigate to target
                 logger.info(f"Navigating to {url}...")
-                page.goto(url, timeout=60000)
-                page.wait_for_load_state("networkidle")
-                
-                # Get content
-                html = page.content()
-                properties = self.parse_html(html)
-                
-                browser.close()
+                await page.goto(url, timeout=60000)
+                await page.wait_for_load_state("networkidle")
 
-        except Exception as e:
-            logger.error(f"Error fetching AtHome data with Playwright: {e}")
-
-        return properties
+                # Get content
+                return await page.content()
+            finally:
+                await context.close()
 
-    def parse_html(self, html: str) -> List[Dict[str, Any]]:
+    def iter_html(self, html: str) -> Iterator[Property]:
         soup = BeautifulSoup(html, 'html.parser')
-        properties = []
-        
+        try:
+            yield from self._iter_buildings(soup, html)
+        finally:
+            soup.decompose()
+
+    def _iter_buildings(self, soup: BeautifulSoup, html: str) -> Iterator[Property]:
         # Select building items
         buildings = soup.select(".p-property")
         
@@ -117,19 +161,16 @@ class AtHomeScraper(BaseScraper):
                     access_text = access_el.text.strip()
                 
                 # Parse Station/Walk from access_text
-                nearest_station = ""
-                walk_minutes = 0
-                if access_text:
-                    # Example: "ＪＲ総武線 「亀戸」駅 徒歩4分"
-                    match = re.search(r'「(.*?)」駅.*?徒歩(\d+)分', access_text)
-                    if match:
-                        nearest_station = match.group(1)
-                        walk_minutes = int(match.group(2))
-                    else:
-                        match = re.search(r'(.+?)駅.*?徒歩(\d+)分', access_text)
-                        if match:
-                            nearest_station = match.group(1).strip()
-                            walk_minutes = int(match.group(2))
+                # Example: "ＪＲ総武線 「亀戸」駅 徒歩4分"
+                route = primary_route(access_text)
+
+                building_record = Building(
+                    title=title, # Use building title
+                    access=access_text,
+                    nearest_station=normalize_station(route.station) if route else "",
+                    walk_minutes=route.walk_minutes if route else 0,
+                    source="AtHome",
+                )
 
                 # Rooms
                 rooms = building.select(".p-property__room--detail-information")
@@ -140,15 +181,7 @@ class AtHomeScraper(BaseScraper):
                 for room in rooms:
                     # Rent
                     price_el = room.select_one(".p-property__room-rent")
-                    price_text = price_el.text.strip() if price_el else "0"
-                    
-                    rent = 0.0
-                    try:
-                        match = re.search(r'([\d\.]+)', price_text)
-                        if match:
-                            rent = float(match.group(1))
-                    except:
-                        pass
+                    rent = to_float(price_el.text) if price_el else 0.0
                         
                     # Admin Fee
                     admin_fee = 0.0
@@ -159,12 +192,7 @@ class AtHomeScraper(BaseScraper):
                     if admin_el:
                         admin_text = admin_el.text.strip().replace(",", "").replace("円", "").replace("管理費等", "").strip()
                         if admin_text != "-" and admin_text.isdigit():
-                            try:
-                                admin_fee = float(admin_text) / 10000.0
-                            except:
-                                pass
-                    
-                    total_price = rent + admin_fee
+                            admin_fee = yen_to_man(admin_text)
                     
                     # Layout
                     layout = ""
@@ -173,11 +201,11 @@ class AtHomeScraper(BaseScraper):
                         layout = layout_el.text.strip()
                     
                     # Area
-                    area = "0"
+                    area = 0.0
                     # Search for m2 in room elements
                     area_el = room.find(string=lambda t: "m²" in t if t else False)
                     if area_el:
-                        area = area_el.strip().replace("m²", "")
+                        area = to_float(area_el)
                     
                     # URL
                     link = ""
@@ -188,41 +216,26 @@ class AtHomeScraper(BaseScraper):
                     if link and not link.startswith("http"):
                         link = f"https://www.athome.co.jp{link}"
 
-                    prop = {
-                        "title": title, # Use building title
-                        "price": rent,
-                        "admin_fee": admin_fee,
-                        "total_price": total_price,
-                        "layout": layout,
-                        "area": area,
-                        "access": access_text,
-                        "nearest_station": nearest_station,
-                        "walk_minutes": walk_minutes,
-                        "url": link,
-                        "source": "AtHome",
-                        "status": "active"
-                    }
-                    
                     if rent > 0 and link:
-                        properties.append(prop)
+                        yield Property(
+                            building=building_record,
+                            url=link,
+                            price=rent,
+                            admin_fee=admin_fee,
+                            layout=layout,
+                            area=area,
+                        )
 
             except Exception as e:
                 logger.warning(f"Error parsing AtHome building: {e}")
                 continue
-                
-        return properties
 
-    def check_availability(self, url: str) -> bool:
-        try:
-            time.sleep(self.delay)
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 404:
-                return False
+    def page_active(self, response) -> bool:
+        if response.status_code == 404:
+            return False
+        
+        # Check for specific "Ended" text
+        if "掲載終了" in response.text or "お探しのページは見つかりません" in response.text:
+            return False
             
-            # Check for specific "Ended" text
-            if "掲載終了" in response.text or "お探しのページは見つかりません" in response.text:
-                return False
-                
-            return True
-        except:
-            return True
+        return True
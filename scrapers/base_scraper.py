@@ -1,43 +1,150 @@
+import asyncio
 from abc import ABC, abstractmethod
 import requests
-import time
 import logging
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from .context import ScraperContext
+from models import Property
+from detail_parser import parse_detail
+import run_journal
+from run_journal import journal
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class BaseScraper(ABC):
-    def __init__(self, source_name: str):
-        self.source_name = source_name
+    # Name of the site, stored as each listing's source (and its key in scrapers.registry)
+    source_name = ""
+    # True if search() can stop early at listings in known_urls
+    supports_incremental = False
+
+    def __init__(self, context: Optional[ScraperContext] = None):
+        # Connections, browsers and caches, shared with the other scrapers of a ScraperRegistry.
+        # A scraper constructed on its own gets a private context and closes it in aclose().
+        self.context = context or ScraperContext()
+        self._owns_context = context is None
         self.headers = config.REQUEST_HEADERS
-        self.delay = config.REQUEST_DELAY
+        # Headers for detail pages (availability checks and enrichment)
+        self.detail_headers = self.headers
+        # Pacing per host is adaptive (see rate_control)
+        self.http = self.context.http
+
+    # The scrapers are implemented as coroutines (*_async) so one event loop can keep
+    # many requests in flight. The plain methods are blocking wrappers around them.
+
+    def run_sync(self, coro: Awaitable[T]) -> T:
+        """Runs a coroutine of this scraper to completion in a fresh event loop."""
+        async def runner():
+            try:
+                return await coro
+            finally:
+                await self.aclose()
+        return asyncio.run(runner())
+
+    async def aclose(self):
+        """Releases connections (and browsers) opened by the async methods, unless the context is shared."""
+        if self._owns_context:
+            await self.context.close()
 
     def fetch_page(self, url: str) -> str:
         """Fetches a single page content."""
+        return self.run_sync(self.fetch_page_async(url))
+
+    async def fetch_page_async(self, url: str) -> str:
+        # A resumed run reuses result pages the interrupted run already fetched
+        found, html = journal.lookup(run_journal.PAGE, url)
+        if found:
+            return html
         try:
-            time.sleep(self.delay)
-            response = requests.get(url, headers=self.headers)
+            response = await self.http.get(url, headers=self.headers)
             response.raise_for_status()
+            journal.record(run_journal.PAGE, url, response.text)
             return response.text
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
             return ""
 
+    def search(self, conditions: Dict[str, Any], known_urls: Optional[Set[str]] = None) -> List[Property]:
+        """
+        Executes search based on conditions and returns a list of Property records.
+        Numeric fields are normalized at parse time (prices in Man-yen, area in m²).
+        If known_urls is given and the scraper supports_incremental, only results newer
+        than the known listings are fetched.
+        """
+        return self.run_sync(self.search_async(conditions, known_urls))
+
+    async def search_async(self, conditions: Dict[str, Any], known_urls: Optional[Set[str]] = None) -> List[Property]:
+        return [p async for p in self.search_stream(conditions, known_urls)]
+
     @abstractmethod
-    def search(self, conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def search_stream(self, conditions: Dict[str, Any], known_urls: Optional[Set[str]] = None) -> AsyncIterator[Property]:
         """
-        Executes search based on conditions and returns a list of property dictionaries.
-        Expected dictionary keys: title, price, address, layout, area, url
+        Yields the search results as each page is parsed (an async generator), so callers
+        keep only the listings they want; each page's HTML and parse tree are released
+        before the next pages are read.
         """
         pass
 
+    def check_availability(self, url: str) -> bool:
+        """Checks if the property URL is still valid (active)."""
+        return self.run_sync(self.check_availability_async(url))
+
+    async def check_availability_async(self, url: str) -> bool:
+        try:
+            response = await self.http.get(url, headers=self.detail_headers)
+            return self.page_active(response)
+        except Exception as e:
+            logger.error(f"Error checking availability for {url}: {e}")
+            return True  # Default to active if unsure
+
     @abstractmethod
-    def parse_html(self, html_content: str) -> List[Dict[str, Any]]:
+    def page_active(self, response) -> bool:
+        """Whether a fetched detail page still shows the listing (not a 404 or "掲載終了" page)."""
+        pass
+
+    async def fetch_detail_async(self, url: str, rent: float = 0.0) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Fetches a listing's detail page once for both uses: (still active, detail_parser fields).
+        Fields are empty for an ended listing. `rent` (Man-yen) converts deposits given in months.
+        Raises requests.HTTPError unless the page was served (2xx): an error page (a 404, or a
+        block or outage) is neither cached nor taken as the listing's status; verification checks it.
+        """
+        response = await self.http.get(url, headers=self.detail_headers)
+        if not 200 <= response.status_code < 300:
+            raise requests.HTTPError(f"{response.status_code} Error for url: {url}", response=response)
+        active = self.page_active(response)
+        return active, (parse_detail(response.text, rent) if active else {})
+
+    def parse_html(self, html_content: str) -> List[Property]:
         """Parses HTML content to extract property details."""
+        return list(self.iter_html(html_content))
+
+    @abstractmethod
+    def iter_html(self, html_content: str) -> Iterator[Property]:
+        """
+        Yields the listings of one result page, then frees the page's parse tree (soup.decompose()).
+        Also runs in parse_pool workers, on an instance constructed without arguments.
+        """
         pass
+
+
+class BrowserScraper(BaseScraper):
+    """A scraper that renders its pages in a browser of the shared context."""
+    # Scrapers asking for the same name share one browser (defaults to source_name)
+    browser_name: Optional[str] = None
+
+    @abstractmethod
+    async def _launch_browser(self, playwright):
+        """Starts this scraper's browser, e.g. `return await playwright.firefox.launch(...)`."""
+        pass
+
+    async def get_browser(self):
+        """Launches the browser on first use; concurrent callers (and scrapers) share the same launch."""
+        return await self.context.browser(self.browser_name or self.source_name, self._launch_browser)
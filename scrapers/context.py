@@ -0,0 +1,80 @@
+"""
+Resources shared by the scrapers of a run (or, in the daemon, of every cycle): one HTTP
+client with its connection pool, the browsers, and the detail-page cache. Per-host rate
+limits (rate_control) and the parse workers (parse_pool) are process-wide already.
+
+HTTP sessions and browsers are started on first use and belong to the event loop that
+started them. open() loads the caches, close() saves them and releases everything else;
+ScraperRegistry owns one context for all of its scrapers.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from playwright.async_api import async_playwright
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from detail_cache import DetailCache
+from run_report import metrics
+from .async_http import AsyncHttpClient
+
+logger = logging.getLogger(__name__)
+
+
+class ScraperContext:
+
+    def __init__(self):
+        self.http = AsyncHttpClient()
+        # Parsed detail pages; loaded by open() when DETAIL_PAGES_ENABLED
+        self.details: Optional[DetailCache] = None
+        self._playwright_task: Optional[asyncio.Future] = None
+        # browser name -> launch, shared by every scraper that asks for that name
+        self._browsers: Dict[str, asyncio.Future] = {}
+
+    async def open(self) -> "ScraperContext":
+        if config.DETAIL_PAGES_ENABLED and self.details is None:
+            self.details = DetailCache(config.DETAIL_CACHE_PATH, config.DETAIL_CACHE_TTL_DAYS)
+        return self
+
+    async def _start_playwright(self):
+        return await async_playwright().start()
+
+    async def _launch(self, launch: Callable[[object], Awaitable[object]]):
+        if self._playwright_task is None:
+            self._playwright_task = asyncio.ensure_future(self._start_playwright())
+        playwright = await self._playwright_task
+        metrics.incr("playwright.launches")
+        return await launch(playwright)
+
+    async def browser(self, name: str, launch: Callable[[object], Awaitable[object]]):
+        """
+        The browser called `name`, started by `await launch(playwright)` on first use.
+        Concurrent callers share the same launch.
+        """
+        if name not in self._browsers:
+            self._browsers[name] = asyncio.ensure_future(self._launch(launch))
+        return await self._browsers[name]
+
+    async def close(self):
+        """Saves the caches and releases connections and browsers."""
+        if self.details is not None:
+            self.details.save()
+        await self.http.close()
+        browsers, self._browsers = self._browsers, {}
+        for name, task in browsers.items():
+            try:
+                browser = await task
+                await browser.close()
+            except Exception as e:
+                logger.error(f"Error closing browser {name}: {e}")
+        if self._playwright_task is not None:
+            try:
+                playwright = await self._playwright_task
+                await playwright.stop()
+            except Exception as e:
+                logger.error(f"Error stopping playwright: {e}")
+            finally:
+                self._playwright_task = None
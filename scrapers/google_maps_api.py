@@ -1,13 +1,17 @@
 import googlemaps
 import json
 import os
+import time
 import logging
+import threading
 from datetime import datetime
+from .http_archive import ArchiveMiss, archive
+from run_report import metrics
 
 logger = logging.getLogger(__name__)
 
 class GoogleMapsClient:
-    def __init__(self, api_key: str, cache_file: str = "route_cache.json"):
+    def __init__(self, api_key: str, cache_file: str = "route_cache.json", geocode_cache_file: str = "geocode_cache.json"):
         self.api_key = api_key
         self.client = None
         if api_key:
@@ -18,21 +22,31 @@ class GoogleMapsClient:
         
         self.cache_file = cache_file
         self.cache = self._load_cache()
+        # address -> [lat, lng], or None if the address couldn't be geocoded
+        self.geocode_cache_file = geocode_cache_file
+        self.geocodes = self._load_cache(geocode_cache_file)
+        # Walking times are looked up from worker threads by the async pipeline
+        self._cache_lock = threading.Lock()
 
-    def _load_cache(self):
-        if os.path.exists(self.cache_file):
+    def _load_cache(self, path=None):
+        path = path or self.cache_file
+        if os.path.exists(path):
             try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
+                with open(path, "r", encoding="utf-8") as f:
                     return json.load(f)
             except Exception as e:
                 logger.error(f"Failed to load route cache: {e}")
                 return {}
         return {}
 
-    def _save_cache(self):
+    def _save_cache(self, path=None, cache=None):
+        # Replayed runs must not change the committed cache, or the next replay would diverge
+        if archive.replaying:
+            return
         try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            with self._cache_lock:
+                with open(path or self.cache_file, "w", encoding="utf-8") as f:
+                    json.dump(dict(self.cache if cache is None else cache), f, ensure_ascii=False, indent=2)
         except Exception as e:
             logger.error(f"Failed to save route cache: {e}")
 
@@ -49,10 +63,12 @@ class GoogleMapsClient:
         
         # Check cache
         if key in self.cache:
+            metrics.incr("route_cache.hit")
             logger.info(f"Cache hit for {origin} -> {destination}: {self.cache[key]} min")
             return self.cache[key]
+        metrics.incr("route_cache.miss")
 
-        if not self.client:
+        if not self.client and not archive.replaying:
             logger.warning("Google Maps API client not initialized (no key provided).")
             return 0
 
@@ -62,12 +78,15 @@ class GoogleMapsClient:
             # Request directions
             # mode="walking"
             now = datetime.now()
-            directions_result = self.client.directions(
+            start = time.perf_counter()
+            directions_result = archive.fetch("maps", key, lambda: self.client.directions(
                 origin,
                 destination,
                 mode="walking",
                 departure_time=now
-            )
+            ))
+            metrics.record_request("https://maps.googleapis.com/maps/api/directions", 200,
+                                   len(json.dumps(directions_result)), time.perf_counter() - start)
 
             if directions_result:
                 # Extract duration
@@ -94,3 +113,43 @@ class GoogleMapsClient:
         except Exception as e:
             logger.error(f"Google Maps API error: {e}")
             return 0
+
+    def geocode(self, address: str):
+        """
+        (lat, lng) of an address, or None if it can't be found. Cached like walking times,
+        including failures, so each address is looked up once.
+        """
+        if not address:
+            return None
+        if address in self.geocodes:
+            metrics.incr("geocode_cache.hit")
+            location = self.geocodes[address]
+            return tuple(location) if location else None
+        metrics.incr("geocode_cache.miss")
+
+        if not self.client and not archive.replaying:
+            return None
+
+        try:
+            start = time.perf_counter()
+            results = archive.fetch("geocode", address, lambda: self.client.geocode(address, region="jp"))
+            metrics.record_request("https://maps.googleapis.com/maps/api/geocode", 200,
+                                   len(json.dumps(results)), time.perf_counter() - start)
+        except ArchiveMiss:
+            # Archives recorded before geocoding existed have no entries; not an error
+            logger.debug(f"No recorded geocode for {address}")
+            return None
+        except Exception as e:
+            logger.error(f"Google Maps geocoding error: {e}")
+            return None
+
+        location = None
+        if results:
+            point = results[0].get("geometry", {}).get("location", {})
+            if "lat" in point and "lng" in point:
+                location = (point["lat"], point["lng"])
+        if location is None:
+            logger.warning(f"Could not geocode {address}")
+        self.geocodes[address] = list(location) if location else None
+        self._save_cache(self.geocode_cache_file, self.geocodes)
+        return location
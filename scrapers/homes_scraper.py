@@ -1,68 +1,101 @@
 import logging
 import time
-import requests
-from typing import List, Dict, Any
+from typing import AsyncIterator, Iterator, Dict, Any, Optional, Set
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-from .stealth_wrapper import stealth_sync
-from .base_scraper import BaseScraper
+from .stealth_wrapper import stealth_async
+from .base_scraper import BrowserScraper
+from .http_archive import archive
+from .context import ScraperContext
+from .parse_pool import parse_pool
+from .registry import register
+from models import Building, Property, to_float, yen_to_man
+from run_report import metrics
+import run_journal
+from run_journal import journal
 
 logger = logging.getLogger(__name__)
 
-class HomesScraper(BaseScraper):
-    def __init__(self):
-        super().__init__("Homes")
+@register
+class HomesScraper(BrowserScraper):
+    source_name = "Homes"
+    browser_name = "chromium"
+
+    def __init__(self, context: Optional[ScraperContext] = None):
+        super().__init__(context)
         self.base_url = "https://www.homes.co.jp/chintai/"
+        # Detail pages (availability checks): plain requests with a current browser UA.
+        # For availability check, we also need playwright if requests is blocked,
+        # but launching browser for every check is slow.
+        self.detail_headers = {
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        }
 
-    def search(self, conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def search_stream(self, conditions: Dict[str, Any], known_urls: Optional[Set[str]] = None) -> AsyncIterator[Property]:
         """
         Searches for properties on LIFULL HOME'S using Playwright.
         """
         # Example URL for Koto-ku
         url = "https://www.homes.co.jp/chintai/tokyo/koto-city/list/"
-        
-        logger.info(f"Fetching {url} with Playwright...")
-        properties = []
-        
-        try:
-            with sync_playwright() as p:
-                # Launch browser
-                # Use headless=True but with args to mimic real browser
-                browser = p.chromium.launch(headless=True, args=["--no-sandbox", "--disable-setuid-sandbox"])
-                context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={"width": 1280, "height": 800}
-                )
-                page = context.new_page()
-                
+
+        found, html = journal.lookup(run_journal.PAGE, url)
+        if not found:
+            logger.info(f"Fetching {url} with Playwright...")
+            html = ""
+            start = time.perf_counter()
+            try:
+                html = await archive.fetch_async("browser", url, lambda: self._render_page_async(url))
+                journal.record(run_journal.PAGE, url, html)
+            except Exception as e:
+                logger.error(f"Error fetching Homes data with Playwright: {e}")
+            finally:
+                metrics.record_request(url, 200 if html else 0, len(html.encode("utf-8")), time.perf_counter() - start)
+
+        if html:
+            for p in await parse_pool.parse(self, html):
+                yield p
+
+    async def _launch_browser(self, playwright):
+        # Use headless=True but with args to mimic real browser
+        return await playwright.chromium.launch(headless=True, args=["--no-sandbox", "--disable-setuid-sandbox"])
+
+    async def _render_page_async(self, url: str) -> str:
+        """Loads the list page in its own stealth browser context and returns the rendered HTML."""
+        browser = await self.get_browser()
+        async with self.http.semaphore(url):
+            metrics.incr("playwright.pages")
+            context = await browser.new_context(
+                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                viewport={"width": 1280, "height": 800}
+            )
+            try:
+                page = await context.new_page()
+
                 # Apply stealth
-                stealth_sync(page)
-                
+                await stealth_async(page)
+
                 # Navigate to top page first to behave like a human
                 logger.info("Visiting top page...")
-                page.goto("https://www.homes.co.jp/", timeout=60000)
-                page.wait_for_timeout(3000) # Wait 3 seconds
-                
+                await page.goto("https://www.homes.co.jp/", timeout=60000)
+                await page.wait_for_timeout(3000) # Wait 3 seconds
+
                 # Then navigate to target
                 logger.info(f"Navigating to {url}...")
-                page.goto(url, timeout=60000)
-                page.wait_for_load_state("networkidle")
-                
-                # Get content
-                html = page.content()
-                properties = self.parse_html(html)
-                
-                browser.close()
-                
-        except Exception as e:
-            logger.error(f"Error fetching Homes data with Playwright: {e}")
+                await page.goto(url, timeout=60000)
+                await page.wait_for_load_state("networkidle")
 
-        return properties
+                # Get content
+                return await page.content()
+            finally:
+                await context.close()
 
-    def parse_html(self, html: str) -> List[Dict[str, Any]]:
+    def iter_html(self, html: str) -> Iterator[Property]:
         soup = BeautifulSoup(html, 'html.parser')
-        properties = []
-        
+        try:
+            yield from self._iter_items(soup, html)
+        finally:
+            soup.decompose()
+
+    def _iter_items(self, soup: BeautifulSoup, html: str) -> Iterator[Property]:
         # Select property items
         # Try multiple selectors as HOME'S might change or have different layouts
         items = soup.select(".ui-frame") 
@@ -86,13 +119,8 @@ class HomesScraper(BaseScraper):
                 
                 # Price
                 price_el = item.select_one(".price")
-                price_text = price_el.text.strip() if price_el else "0"
                 # Parse "11.5万円"
-                rent = 0.0
-                try:
-                    rent = float(price_text.replace("万円", ""))
-                except:
-                    pass
+                rent = to_float(price_el.text) if price_el else 0.0
                 
                 # Admin Fee
                 admin_el = item.select_one(".priceAdmin")
@@ -100,17 +128,12 @@ class HomesScraper(BaseScraper):
                 if admin_el:
                     admin_text = admin_el.text.strip().replace("円", "").replace("管理費等", "").strip()
                     if admin_text != "-":
-                        try:
-                            admin_fee = float(admin_text) / 10000.0
-                        except:
-                            pass
-                
-                total_price = rent + admin_fee
+                        admin_fee = yen_to_man(admin_text)
 
                 # Layout / Area
                 # These might be in a table or specific classes
                 layout = ""
-                area = ""
+                area = 0.0
                 
                 # Layout often in .madori
                 layout_el = item.select_one(".madori")
@@ -120,7 +143,7 @@ class HomesScraper(BaseScraper):
                 # Area often in .menseki
                 area_el = item.select_one(".menseki")
                 if area_el:
-                    area = area_el.text.strip().replace("m²", "")
+                    area = to_float(area_el.text)
                 
                 # Station / Access
                 access_text = ""
@@ -142,51 +165,30 @@ class HomesScraper(BaseScraper):
                 if link and not link.startswith("http"):
                     link = f"https://www.homes.co.jp{link}"
 
-                prop = {
-                    "title": title,
-                    "price": rent,
-                    "admin_fee": admin_fee,
-                    "total_price": total_price,
-                    "layout": layout,
-                    "area": area,
-                    "access": access_text,
-                    "url": link,
-                    "source": "Homes",
-                    "status": "active"
-                }
-                
                 # Basic validation
                 if title != "Unknown" and link:
-                    properties.append(prop)
+                    yield Property(
+                        building=Building(title=title, access=access_text, source="Homes"),
+                        url=link,
+                        price=rent,
+                        admin_fee=admin_fee,
+                        layout=layout,
+                        area=area,
+                    )
                     
             except Exception as e:
                 logger.warning(f"Error parsing Homes item: {e}")
                 continue
-                
-        return properties
 
-    def check_availability(self, url: str) -> bool:
-        try:
-            # For availability check, we also need playwright if requests is blocked
-            # But launching browser for every check is slow.
-            # Maybe try requests first, if 403, assume active? Or use playwright?
-            # Let's try requests with headers first.
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            }
-            time.sleep(self.delay)
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 404:
-                return False
-            if response.status_code == 403:
-                # If blocked, we can't be sure. Assume active to be safe?
-                # Or try playwright?
-                return True 
+    def page_active(self, response) -> bool:
+        if response.status_code == 404:
+            return False
+        if response.status_code == 403:
+            # If blocked, we can't be sure. Assume active to be safe?
+            # Or try playwright?
+            return True 
+        
+        if "掲載終了" in response.text or "エラー" in response.text:
+            return False
             
-            if "掲載終了" in response.text or "エラー" in response.text:
-                return False
-                
-            return True
-        except:
-            return True
+        return True
@@ -0,0 +1,169 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import requests
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from run_report import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveMiss(requests.ConnectionError):
+    """Raised in replay mode when a request was never recorded.
+    Subclasses ConnectionError so existing network error handling applies unchanged."""
+
+
+class ArchivedResponse:
+    """Minimal stand-in for requests.Response that survives a record/replay round trip."""
+
+    def __init__(self, url: str, status_code: int, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+    @classmethod
+    def from_response(cls, response) -> "ArchivedResponse":
+        return cls(response.url, response.status_code, response.text)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ArchivedResponse":
+        return cls(data["url"], data["status_code"], data["text"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"url": self.url, "status_code": self.status_code, "text": self.text}
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HttpArchive:
+    """
+    Gzip-compressed JSON-lines archive of everything the scrape pipeline fetches.
+    Each entry is keyed by kind ("http", "browser", "maps") and request key (URL or route).
+    Repeated requests for the same key are replayed in the order they were recorded.
+    """
+
+    MODES = ("off", "record", "replay")
+
+    def __init__(self, path: str, mode: str = "off"):
+        self.path = path
+        self.mode = "off"
+        self._entries: Dict[str, List[Any]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.configure(mode, path)
+
+    def configure(self, mode: str, path: Optional[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown archive mode: {mode}")
+        self.mode = mode
+        if path:
+            self.path = path
+        self._entries = {}
+        self._cursor = {}
+
+        if mode == "replay":
+            self._load()
+        elif mode == "record":
+            # Start a fresh archive for every recorded run
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            logger.info(f"Recording responses to {self.path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.warning(f"Replay archive {self.path} not found. Every request will miss.")
+            return
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry["value"])
+                count += 1
+        logger.info(f"Loaded {count} archived responses from {self.path}")
+
+    def _record(self, key: str, value: Any):
+        line = json.dumps({"key": key, "value": value}, ensure_ascii=False)
+        with self._lock:
+            # Each append is its own gzip member, so a crashed run still leaves a readable archive
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _replay(self, key: str) -> Any:
+        with self._lock:
+            values = self._entries.get(key)
+            if not values:
+                raise ArchiveMiss(f"Not in replay archive: {key}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            # Once exhausted, keep serving the last recorded value
+            return values[min(index, len(values) - 1)]
+
+    def fetch(self, kind: str, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the value for (kind, key). In replay mode it comes from the archive,
+        otherwise loader() is called and, in record mode, its result is archived.
+        The loader must return JSON-serializable data.
+        """
+        archive_key = f"{kind}:{key}"
+        if self.mode == "replay":
+            return self._replay(archive_key)
+
+        value = loader()
+        if self.mode == "record":
+            self._record(archive_key, value)
+        return value
+
+    async def fetch_async(self, kind: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """fetch() for async loaders: loader() returns an awaitable."""
+        archive_key = f"{kind}:{key}"
+        if self.mode == "replay":
+            return self._replay(archive_key)
+
+        value = await loader()
+        if self.mode == "record":
+            self._record(archive_key, value)
+        return value
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None):
+        """requests.get() through the archive. Returns a real Response when archiving is off."""
+        start = time.perf_counter()
+        status = 0
+        nbytes = 0
+        try:
+            if not self.enabled:
+                response = requests.get(url, headers=headers)
+            else:
+                data = self.fetch("http", url, lambda: ArchivedResponse.from_response(requests.get(url, headers=headers)).to_dict())
+                response = ArchivedResponse.from_dict(data)
+            status = response.status_code
+            nbytes = len(response.content)
+            return response
+        finally:
+            metrics.record_request(url, status, nbytes, time.perf_counter() - start)
+
+
+archive = HttpArchive(config.ARCHIVE_PATH, config.ARCHIVE_MODE)
@@ -0,0 +1,128 @@
+"""
+Result-page parsing in worker processes.
+
+BeautifulSoup is pure Python: with many pages fetched concurrently, parsing them on the
+event loop's thread keeps one core busy while the others idle, and stalls the requests
+in flight. ParsePool hands each page to a process pool instead (PARSE_WORKERS processes):
+
+- a worker gets the scraper class and the page as UTF-8 bytes, runs the scraper's
+  iter_html() and sends back plain tuples, one per building and one per room, rather
+  than soup or Property objects; the parent rebuilds the Property objects from them
+  (rooms of one building still share one Building).
+- PARSE_WORKERS=0 parses in-process, as before. So does a pool that can't be started or
+  breaks (a worker killed, no process support on the platform): the page is parsed
+  in-process and the pool is not used again.
+
+Scrapers are constructed without arguments in the workers, one per class, for parsing only.
+"""
+import asyncio
+import logging
+import multiprocessing
+import pickle
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import fields
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from models import Building, Property
+from run_report import metrics
+
+logger = logging.getLogger(__name__)
+
+BUILDING_FIELDS = [f.name for f in fields(Building)]
+ROOM_FIELDS = [f.name for f in fields(Property) if f.name != "building"]
+
+# (buildings, rooms): building field tuples, and room field tuples led by their building's index
+Records = Tuple[List[tuple], List[tuple]]
+
+
+def pack(properties: Iterable[Property]) -> Records:
+    properties = list(properties)  # Keeps every Building alive, so ids stay unique
+    buildings: List[tuple] = []
+    numbers: Dict[int, int] = {}
+    rooms = []
+    for p in properties:
+        number = numbers.get(id(p.building))
+        if number is None:
+            number = numbers[id(p.building)] = len(buildings)
+            buildings.append(tuple(getattr(p.building, f) for f in BUILDING_FIELDS))
+        rooms.append((number,) + tuple(getattr(p, f) for f in ROOM_FIELDS))
+    return buildings, rooms
+
+
+def unpack(records: Records) -> List[Property]:
+    building_rows, rooms = records
+    buildings = [Building(*row) for row in building_rows]
+    return [Property(buildings[room[0]], *room[1:]) for room in rooms]
+
+
+# Worker side: one parsing instance per scraper class
+_parsers: Dict[type, object] = {}
+
+
+def _init_worker():
+    # Ctrl-C reaches the whole process group; the parent stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _parse_page(scraper_class: type, data: bytes) -> Records:
+    parser = _parsers.get(scraper_class)
+    if parser is None:
+        parser = _parsers[scraper_class] = scraper_class()
+    return pack(parser.iter_html(data.decode("utf-8")))
+
+
+class ParsePool:
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._failed = False
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0 or self._failed:
+            return None
+        if self._executor is None:
+            try:
+                # Spawned, not forked: the parent runs an event loop and threads (browser, DNS)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Parsing result pages in {self.workers} worker processes")
+            except (OSError, NotImplementedError, ImportError) as e:
+                self._give_up(e)
+        return self._executor
+
+    def _give_up(self, error: Exception):
+        logger.warning(f"Parse pool unavailable, parsing in-process: {error}")
+        self._failed = True
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, scraper, html: str) -> List[Property]:
+        """The listings of one result page (scraper.iter_html), parsed in a worker when possible."""
+        executor = self._pool()
+        if executor is not None:
+            try:
+                records = await asyncio.get_running_loop().run_in_executor(
+                    executor, _parse_page, type(scraper), html.encode("utf-8"))
+                metrics.incr("parse.pool")
+                return unpack(records)
+            except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+                self._give_up(e)
+        metrics.incr("parse.in_process")
+        return scraper.parse_html(html)
+
+    def close(self):
+        """Stops the workers; the next parse starts them again."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+parse_pool = ParsePool(config.PARSE_WORKERS)
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from .http_archive import archive
+from run_report import metrics
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean "slow down": forbidden (WAF), too many requests, overloaded.
+# 0 stands for a connection error.
+THROTTLE_STATUSES = {0, 403, 429, 503}
+# Smoothing of the latency average (weight of the newest sample)
+LATENCY_ALPHA = 0.2
+# Samples needed before latency spikes are trusted
+LATENCY_WARMUP = 5
+# Good responses needed (at least; `limit` if higher) before speeding up again
+MIN_GOOD_STREAK = 10
+
+
+class HostLimiter:
+    """
+    Adaptive limit for one host (AIMD, as in TCP congestion control):
+    after every `limit` (at least MIN_GOOD_STREAK) consecutive good responses the pause between request starts
+    shrinks, and one more request may be in flight if the limit was reached; a throttling response or a latency
+    spike halves the limit and doubles the pause.
+
+    `async with limiter:` waits for a free slot and the pause. The waiters belong to
+    the event loop that uses them; the learned limit/interval outlive the loop.
+    """
+
+    def __init__(self, host: str, limit: int, interval: float, latency: Optional[float] = None):
+        self.host = host
+        self.limit = limit
+        self.interval = interval
+        self.latency = latency
+        self.samples = LATENCY_WARMUP if latency is not None else 0
+        self._good_streak = 0
+        # Whether the limit was reached since it last changed (growing an unused limit proves nothing)
+        self._saturated = False
+        self._last_backoff = 0.0
+        self._in_flight = 0
+        self._next_start = 0.0
+        self._loop = None
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Requests of a finished loop can't be in flight any more
+            self._loop = loop
+            self._cond = asyncio.Condition()
+            self._in_flight = 0
+            self._next_start = 0.0
+        return self._cond
+
+    async def __aenter__(self):
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            if self._in_flight >= self.limit:
+                self._saturated = True
+        # Only then is the start booked: requests queued for a slot still start `interval`
+        # apart once slots free up (re-read after each wait, as it adapts)
+        try:
+            while rate_control.pacing:
+                now = time.monotonic()
+                if now >= self._next_start:
+                    self._next_start = now + self.interval
+                    break
+                await asyncio.sleep(self._next_start - now)
+        except BaseException:
+            await self.__aexit__()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        cond = self._condition()
+        async with cond:
+            self._in_flight -= 1
+            cond.notify_all()
+
+    def record(self, status: int, seconds: float, started: float):
+        """Feeds one response back; `started` is its time.monotonic() start."""
+        spike = (status not in THROTTLE_STATUSES and self.samples >= LATENCY_WARMUP
+                 and seconds > self.latency * config.RATE_LATENCY_SPIKE_FACTOR)
+        if status not in THROTTLE_STATUSES:
+            self.latency = seconds if self.latency is None else (1 - LATENCY_ALPHA) * self.latency + LATENCY_ALPHA * seconds
+            self.samples += 1
+
+        if status in THROTTLE_STATUSES or spike:
+            # Requests sent before the last backoff reflect the old rate; count them once
+            if started < self._last_backoff:
+                return
+            self._last_backoff = time.monotonic()
+            self._good_streak = 0
+            self._saturated = False
+            self.limit = max(1, self.limit // 2)
+            self.interval = min(config.RATE_MAX_INTERVAL, max(self.interval * 2, config.RATE_MIN_INTERVAL))
+            reason = "latency spike" if spike else (f"HTTP {status}" if status else "connection error")
+            logger.warning(f"Backing off {self.host} ({reason}): {self.limit} in flight, {self.interval:.2f}s apart")
+            metrics.incr("rate_control.backoff")
+            return
+
+        self._good_streak += 1
+        if self._good_streak >= max(self.limit, MIN_GOOD_STREAK):
+            self._good_streak = 0
+            if self._saturated:
+                self._saturated = False
+                self.limit = min(config.RATE_MAX_CONNECTIONS_PER_HOST, self.limit + 1)
+            self.interval = max(config.RATE_MIN_INTERVAL, self.interval * 0.8)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "interval": round(self.interval, 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+class RateController:
+    """
+    Per-host limiters shared by every scraper, persisted to config.RATE_LIMITS_PATH
+    so the next run starts from what the sites tolerated last time.
+    Replays neither pace nor learn (the archive is local).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._saved: Optional[Dict[str, dict]] = None
+
+    @property
+    def pacing(self) -> bool:
+        return not archive.replaying
+
+    def _load(self):
+        self._saved = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._saved = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading rate limits: {e}")
+
+    def limiter(self, url: str) -> HostLimiter:
+        host = urlparse(url).netloc
+        if host not in self._limiters:
+            if self._saved is None:
+                self._load()
+            saved = self._saved.get(host)
+            if saved and self.pacing:
+                # Clamped, in case the bounds were lowered since
+                limit = max(1, min(config.RATE_MAX_CONNECTIONS_PER_HOST, int(saved["limit"])))
+                interval = min(config.RATE_MAX_INTERVAL, max(config.RATE_MIN_INTERVAL, float(saved["interval"])))
+                self._limiters[host] = HostLimiter(host, limit, interval, saved.get("latency"))
+            else:
+                self._limiters[host] = HostLimiter(host, config.MAX_CONNECTIONS_PER_HOST, config.REQUEST_DELAY)
+        return self._limiters[host]
+
+    def record(self, url: str, status: int, seconds: float, started: float):
+        if self.pacing:
+            self.limiter(url).record(status, seconds, started)
+
+    def save(self):
+        if not self.pacing or not self._limiters:
+            return
+        if self._saved is None:
+            self._load()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for host, limiter in self._limiters.items():
+            self._saved[host] = dict(limiter.to_dict(), updated=now)
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._saved, f, ensure_ascii=False, indent=2, sort_keys=True)
+        except Exception as e:
+            logger.error(f"Error saving rate limits: {e}")
+
+
+rate_control = RateController(config.RATE_LIMITS_PATH)
@@ -0,0 +1,86 @@
+"""
+Scrapers by source name: the "SUUMO" / "AtHome" / "Homes" stored in each listing's
+source column. Scraper classes register themselves with @register; SCRAPER_MODULES are
+imported on first lookup, so callers never name the classes.
+
+A ScraperRegistry creates each scraper on first use, all with one ScraperContext, so
+search, detail pages and verification reuse the same connections and browsers.
+"""
+import importlib
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from .context import ScraperContext
+from .parse_pool import parse_pool
+
+logger = logging.getLogger(__name__)
+
+SCRAPER_MODULES = ("suumo_scraper", "homes_scraper", "athome_scraper")
+
+# source_name -> scraper class
+SCRAPERS: Dict[str, type] = {}
+
+
+def register(cls):
+    SCRAPERS[cls.source_name] = cls
+    return cls
+
+
+def scraper_classes() -> Dict[str, type]:
+    for module in SCRAPER_MODULES:
+        importlib.import_module(f".{module}", __package__)
+    return SCRAPERS
+
+
+class ScraperRegistry:
+    """
+    `async with ScraperRegistry() as registry:` or open()/close() around a run. Sources
+    that are searched default to config.SEARCH_SOURCES; any registered source can be
+    looked up, e.g. to verify listings stored by a site that is no longer searched.
+    """
+
+    def __init__(self, search_sources: Optional[Iterable[str]] = None):
+        self.context = ScraperContext()
+        self.search_sources = list(search_sources if search_sources is not None else config.SEARCH_SOURCES)
+        self._scrapers = {}
+
+    async def open(self) -> "ScraperRegistry":
+        await self.context.open()
+        return self
+
+    async def close(self):
+        """Releases the shared context and stops the parse workers."""
+        try:
+            await self.context.close()
+        finally:
+            parse_pool.close()
+
+    async def __aenter__(self) -> "ScraperRegistry":
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def get(self, source: str):
+        """The scraper of a source, or None if no scraper is registered for it."""
+        scraper = self._scrapers.get(source)
+        if scraper is None:
+            scraper_class = scraper_classes().get(source)
+            if scraper_class is None:
+                return None
+            scraper = self._scrapers[source] = scraper_class(self.context)
+        return scraper
+
+    def search_scrapers(self) -> List:
+        scrapers = []
+        for source in self.search_sources:
+            scraper = self.get(source)
+            if scraper is None:
+                logger.warning(f"No scraper registered for source {source}")
+            else:
+                scrapers.append(scraper)
+        return scrapers
@@ -1,5 +1,6 @@
 import logging
 from playwright.sync_api import Page
+from playwright.async_api import Page as AsyncPage
 
 logger = logging.getLogger(__name__)
 
@@ -35,3 +36,28 @@ def stealth_sync(page: Page):
         pass
         
     logger.warning("Could not apply stealth_sync. playwright-stealth might not be installed correctly.")
+
+
+async def stealth_async(page: AsyncPage):
+    """
+    stealth_sync() for playwright.async_api pages.
+    """
+    try:
+        # Try 1.x style (function export)
+        from playwright_stealth import stealth_async as _stealth_async
+        await _stealth_async(page)
+        return
+    except ImportError:
+        pass
+
+    try:
+        # Try 2.x style (Class based)
+        from playwright_stealth import Stealth
+        stealth = Stealth()
+        if hasattr(stealth, "apply_stealth_async"):
+            await stealth.apply_stealth_async(page)
+            return
+    except ImportError:
+        pass
+
+    logger.warning("Could not apply stealth_async. playwright-stealth might not be installed correctly.")
@@ -1,19 +1,27 @@
-from typing import List, Dict, Any
+from typing import AsyncIterator, Dict, Any, Iterator, Optional, Set
 from bs4 import BeautifulSoup
 import logging
 import urllib.parse
-import time
-import requests
+import asyncio
 from .base_scraper import BaseScraper
+from .context import ScraperContext
+from .parse_pool import parse_pool
+from .registry import register
+from models import Building, Property, normalize_station, to_float, yen_to_man
+from access_parser import primary_route
 
 logger = logging.getLogger(__name__)
 
+@register
 class SuumoScraper(BaseScraper):
-    def __init__(self):
-        super().__init__("SUUMO")
+    source_name = "SUUMO"
+    supports_incremental = True
+
+    def __init__(self, context: Optional[ScraperContext] = None):
+        super().__init__(context)
         self.base_url = "https://suumo.jp/jj/chintai/ichiran/FR301FC001/"
 
-    def search(self, conditions: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def search_stream(self, conditions: Dict[str, Any], known_urls: Optional[Set[str]] = None) -> AsyncIterator[Property]:
         # Default parameters (Tokyo, Chintai)
         params = {
             "ar": "030", # Kanto
@@ -72,40 +80,72 @@ class SuumoScraper(BaseScraper):
             else: et = "9999999"
             params["et"] = et
 
+        # Incremental mode: newest listings first, so known ones cluster at the end
+        if known_urls is not None:
+            params["po1"] = "09"  # 新着順
+            params["po2"] = "99"
+
         # Construct Base URL
         query_string = urllib.parse.urlencode(params, doseq=True)
         base_target_url = f"{self.base_url}?{query_string}"
         
-        all_properties = []
+        total = 0
         page = 1
         
         while True:
-            target_url = f"{base_target_url}&pn={page}"
-            logger.info(f"Fetching page {page}: {target_url}")
-            
-            html = self.fetch_page(target_url)
-            if not html:
-                break
-
-            properties = self.parse_html(html)
-            if not properties:
-                logger.info(f"No properties found on page {page}. Stopping.")
+            # A full sweep fetches as many pages at once as the host currently allows;
+            # incremental runs go page by page because each page decides whether the next one is needed.
+            window = 1 if known_urls is not None else self.http.semaphore(base_target_url).limit
+            pages = list(range(page, page + window))
+            for n in pages:
+                logger.info(f"Fetching page {n}: {base_target_url}&pn={n}")
+            htmls = await asyncio.gather(*(self.fetch_page_async(f"{base_target_url}&pn={n}") for n in pages))
+            # The window's pages are parsed at once (in worker processes, see parse_pool)
+            # and passed on in order; only the listings are kept, not the HTML
+            parsed = [asyncio.ensure_future(parse_pool.parse(self, html)) if html else None for html in htmls]
+            del htmls
+
+            done = False
+            try:
+                for n, page_properties in zip(pages, parsed):
+                    if page_properties is None:
+                        done = True
+                        break
+
+                    properties = await page_properties
+                    all_known = known_urls is not None and all(p.url in known_urls for p in properties)
+                    for p in properties:
+                        yield p
+                    count = len(properties)
+                    if not count:
+                        logger.info(f"No properties found on page {n}. Stopping.")
+                        done = True
+                        break
+
+                    total += count
+                    logger.info(f"Found {count} properties on page {n}. Total: {total}")
+
+                    if known_urls is not None and all_known:
+                        logger.info(f"Every listing on page {n} is already known. Stopping.")
+                        done = True
+                        break
+            finally:
+                for page_properties in parsed:
+                    if page_properties is not None:
+                        page_properties.cancel()
+            if done:
                 break
             
-            all_properties.extend(properties)
-            logger.info(f"Found {len(properties)} properties on page {page}. Total: {len(all_properties)}")
-            
-            page += 1
-            time.sleep(self.delay)
-        
-        return all_properties
+            page += window
 
-    def parse_html(self, html_content: str) -> List[Dict[str, Any]]:
+    def iter_html(self, html_content: str) -> Iterator[Property]:
         soup = BeautifulSoup(html_content, 'html.parser')
-        properties = []
+        try:
+            yield from self._iter_items(soup.find_all("div", class_="cassetteitem"))
+        finally:
+            soup.decompose()
 
-        items = soup.find_all("div", class_="cassetteitem")
-        
+    def _iter_items(self, items) -> Iterator[Property]:
         for item in items:
             try:
                 detail = item.find("div", class_="cassetteitem-detail")
@@ -121,140 +161,87 @@ class SuumoScraper(BaseScraper):
                 
                 # Parse access text for nearest station and walk minutes
                 # Format usually: "Line/Station Walk X min" e.g. "東京メトロ有楽町線/豊洲駅 歩7分"
-                # Sometimes multiple lines. We take the first one or the one matching our target?
-                # For now, let's take the first valid one.
-                nearest_station = ""
-                walk_minutes = 0
-                
-                if access_text:
-                    # Simple parsing strategy
-                    # Split by newline if multiple
-                    lines = access_text.split('\n')
-                    for line in lines:
-                        # Try to find "歩X分"
-                        import re
-                        match = re.search(r'/(.+?)駅? 歩(\d+)分', line)
-                        if match:
-                            nearest_station = match.group(1) + "駅" # Ensure '駅' suffix if we want consistency
-                            walk_minutes = int(match.group(2))
-                            break # Use the first one found
-                        
-                        # Fallback regex if format is slightly different
-                        match_alt = re.search(r'([^/]+?) 歩(\d+)分', line)
-                        if match_alt and not nearest_station:
-                             # This might match line name if no slash, but usually it's Line/Station
-                             pass
+                # Sometimes multiple lines. We take the first walking route.
+                route = primary_route(access_text)
+
+                building = Building(
+                    title=title,
+                    address=address,
+                    access=access_text,
+                    nearest_station=normalize_station(route.station) if route else "",
+                    walk_minutes=route.walk_minutes if route else 0,
+                    source=self.source_name,
+                )
 
                 rooms = item.find_all("tr", class_="js-cassette_link")
                 
                 for room in rooms:
-                    room_props = {}
-                    room_props['title'] = title
-                    room_props['address'] = address
-                    room_props['access'] = access_text 
-                    room_props['nearest_station'] = nearest_station
-                    room_props['walk_minutes'] = walk_minutes
-                    room_props['source'] = self.source_name
-
                     cols = room.find_all("td")
                     if len(cols) < 9:
                         continue
 
+                    # URL
+                    url_el = room.find("a", class_="js-cassette_link_href")
+                    if not (url_el and url_el.has_attr('href')):
+                        continue
+                    link = url_el['href']
+                    if link.startswith("/"):
+                        link = "https://suumo.jp" + link
+
                     # Price (Index 3)
                     price_el = cols[3].find("span", class_="cassetteitem_price--rent")
                     admin_el = cols[3].find("span", class_="cassetteitem_price--administration")
                     
-                    rent = 0.0
-                    admin_fee = 0.0
-                    
-                    if price_el:
-                        # "11.5万円" -> 11.5
-                        price_text = price_el.text.strip().replace("万円", "")
-                        try:
-                            rent = float(price_text)
-                        except ValueError:
-                            rent = 0.0
-                    
-                    if admin_el:
-                        # "11000円" -> 1.1 (Man-yen) or "-" -> 0
-                        admin_text = admin_el.text.strip().replace("円", "")
-                        if admin_text == "-":
-                            admin_fee = 0.0
-                        else:
-                            try:
-                                admin_fee = float(admin_text) / 10000.0
-                            except ValueError:
-                                admin_fee = 0.0
-
-                    room_props['price'] = rent
-                    room_props['admin_fee'] = admin_fee
-                    room_props['total_price'] = rent + admin_fee
+                    # "11.5万円" -> 11.5
+                    rent = to_float(price_el.text) if price_el else 0.0
+                    # "11000円" -> 1.1 (Man-yen) or "-" -> 0
+                    admin_fee = yen_to_man(admin_el.text) if admin_el else 0.0
                     
                     # Layout / Area (Index 5)
                     layout_el = cols[5].find("span", class_="cassetteitem_madori")
                     area_el = cols[5].find("span", class_="cassetteitem_menseki")
-                    room_props['layout'] = layout_el.text.strip() if layout_el else ""
-                    if area_el:
-                        area_text = area_el.text.strip().replace("m2", "")
-                        try:
-                            room_props['area'] = float(area_text)
-                        except ValueError:
-                            room_props['area'] = 0.0
-                    else:
-                        room_props['area'] = 0.0
 
-                    # URL
-                    url_el = room.find("a", class_="js-cassette_link_href")
-                    if url_el and url_el.has_attr('href'):
-                        link = url_el['href']
-                        if link.startswith("/"):
-                            link = "https://suumo.jp" + link
-                        room_props['url'] = link
-                    
-                    if 'url' in room_props:
-                        properties.append(room_props)
+                    yield Property(
+                        building=building,
+                        url=link,
+                        price=rent,
+                        admin_fee=admin_fee,
+                        layout=layout_el.text.strip() if layout_el else "",
+                        area=to_float(area_el.text) if area_el else 0.0,
+                    )
 
             except Exception as e:
                 logger.error(f"Error parsing item: {e}")
                 continue
 
-        return properties
-
-    def check_availability(self, url: str) -> bool:
-        """Checks if the property URL is still valid (active)."""
-        try:
-            time.sleep(self.delay)
-            response = requests.get(url, headers=self.headers)
-            
-            # If 404, it's definitely gone
-            if response.status_code == 404:
-                return False
-            
-            # SUUMO often redirects to a "listing ended" page or shows a message
-            # The URL might change or content might say "掲載終了"
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Check for common "Ended" indicators
-            # 1. Title often says "エラー" or "掲載終了"
-            page_title = soup.title.text.strip() if soup.title else ""
-            # SUUMO error page title is usually "エラー｜SUUMO(スーモ)"
-            if "エラー" in page_title or "掲載終了" in page_title:
-                return False
-                
-            # 2. Specific error box or message
-            # Sometimes it says "お探しの物件は掲載終了..." in a div
-            if "掲載を終了" in response.text or "掲載終了" in response.text:
-                # Be careful not to match footer links, but usually safe if in body text
-                # Let's check specific elements if possible, but text search is a catch-all
-                # "この物件は掲載を終了しました" is common
-                pass
+    def page_active(self, response) -> bool:
+        """Checks if the fetched property page is still valid (active)."""
+        # If 404, it's definitely gone
+        if response.status_code == 404:
+            return False
+        
+        # SUUMO often redirects to a "listing ended" page or shows a message
+        # The URL might change or content might say "掲載終了"
+        soup = BeautifulSoup(response.text, 'html.parser')
+        
+        # Check for common "Ended" indicators
+        # 1. Title often says "エラー" or "掲載終了"
+        page_title = soup.title.text.strip() if soup.title else ""
+        # SUUMO error page title is usually "エラー｜SUUMO(スーモ)"
+        if "エラー" in page_title or "掲載終了" in page_title:
+            return False
             
-            # If we are redirected to the top page or search page, it's also ended
-            if "suumo.jp/chintai/" in response.url and "jnc_" not in response.url:
-                # If redirected away from property detail (jnc_...), likely ended
-                pass
+        # 2. Specific error box or message
+        # Sometimes it says "お探しの物件は掲載終了..." in a div
+        if "掲載を終了" in response.text or "掲載終了" in response.text:
+            # Be careful not to match footer links, but usually safe if in body text
+            # Let's check specific elements if possible, but text search is a catch-all
+            # "この物件は掲載を終了しました" is common
+            pass
+        
+        # If we are redirected to the top page or search page, it's also ended
+        if "suumo.jp/chintai/" in response.url and "jnc_" not in response.url:
+            # If redirected away from property detail (jnc_...), likely ended
+            pass
 
-            return True
-        except Exception as e:
-            logger.error(f"Error checking availability for {url}: {e}")
-            return True # Default to active if unsure
+        return True
@@ -0,0 +1,130 @@
+"""
+Named search profiles, e.g. one per household member. search_conditions.json holds either
+a single condition set (as before) or several named ones:
+
+    {"profiles": {"alice": {"stations": [...], "rent": {"max": 130000}},
+                  "bob":   {"stations": [...], "layouts": ["1LDK"]}}}
+
+A scrape searches the union of all profiles once. Each profile then picks its own
+listings from the stored results with ProfileFilter, so N profiles cost about one scrape.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List
+
+from access_parser import StationMatcher, parse_access
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "default"
+
+# Conditions given as {"min": ..., "max": ...}
+RANGE_KEYS = ["rent", "age", "walk_minutes"]
+# Conditions given as a list of accepted values
+LIST_KEYS = ["stations", "layouts"]
+
+
+def load_profiles(path: str, defaults: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """{profile name: conditions}, each merged over the defaults (config.SEARCH_CONDITIONS)."""
+    if not os.path.exists(path):
+        return {DEFAULT_PROFILE: defaults.copy()}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user_conditions = json.load(f)
+        logger.info(f"Loaded conditions from {path}")
+    except Exception as e:
+        logger.error(f"Failed to load {os.path.basename(path)}: {e}")
+        return {DEFAULT_PROFILE: defaults.copy()}
+
+    named = user_conditions.get("profiles") or {DEFAULT_PROFILE: user_conditions}
+    profiles = {}
+    for name, conditions in named.items():
+        merged = defaults.copy()
+        merged.update(conditions)
+        profiles[name] = merged
+    return profiles
+
+
+def union_conditions(profiles: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The loosest conditions covering every profile: lists are merged, ranges widened.
+    A condition missing from any profile is left out, since that profile doesn't restrict it.
+    """
+    conditions_list = list(profiles.values())
+    if len(conditions_list) == 1:
+        return conditions_list[0].copy()
+
+    union = conditions_list[0].copy()
+    for key in RANGE_KEYS:
+        if not all(key in c for c in conditions_list):
+            union.pop(key, None)
+            continue
+        merged = {"min": min(c[key].get("min", 0) for c in conditions_list)}
+        if all("max" in c[key] for c in conditions_list):
+            merged["max"] = max(c[key]["max"] for c in conditions_list)
+        union[key] = merged
+    for key in LIST_KEYS:
+        if not all(c.get(key) for c in conditions_list):
+            union.pop(key, None)
+            continue
+        # dict.fromkeys keeps the first profile's order
+        union[key] = list(dict.fromkeys(v for c in conditions_list for v in c[key]))
+    return union
+
+
+class ProfileFilter:
+    """
+    Applies one profile's conditions to stored records (dicts with price, layout,
+    access, walk_minutes and building_age). Building age is only known for listings whose
+    detail page was fetched (DETAIL_PAGES_ENABLED); the others pass the "age" condition,
+    which the site search (of the union conditions) applies only in coarse steps.
+    """
+
+    def __init__(self, conditions: Dict[str, Any]):
+        self.conditions = conditions
+        self.stations = StationMatcher(conditions.get("stations") or [])
+        self.layouts = set(conditions.get("layouts") or [])
+        rent = conditions.get("rent", {})
+        # Stored prices are Man-yen; conditions are yen
+        self.min_rent = rent.get("min", 0) / 10000
+        self.max_rent = rent["max"] / 10000 if "max" in rent else None
+        self.max_walk = conditions.get("walk_minutes", {}).get("max")
+        age = conditions.get("age", {})
+        self.min_age = age.get("min", 0)
+        self.max_age = age.get("max")
+
+    def _walk_minutes(self, record: Dict[str, Any]):
+        """Walk to the nearest of the profile's stations, else the listing's nearest station."""
+        if self.stations.stations:
+            walks = [r.walk_minutes for r in parse_access(record.get("access") or "")
+                     if r.station in self.stations.stations and r.bus_minutes is None]
+            if walks:
+                return min(walks)
+        return record.get("walk_minutes")
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        if self.stations.stations and not self.stations.matches(record.get("access") or ""):
+            return False
+        if self.layouts and record.get("layout") not in self.layouts:
+            return False
+        price = record.get("price") or 0.0
+        if price < self.min_rent or (self.max_rent is not None and price > self.max_rent):
+            return False
+        if self.max_walk is not None:
+            walk = self._walk_minutes(record)
+            if walk is not None and walk > self.max_walk:
+                return False
+        age = record.get("building_age")
+        if age is not None and (age < self.min_age or (self.max_age is not None and age > self.max_age)):
+            return False
+        return True
+
+    def filter(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [r for r in records if self.matches(r)]
+
+
+def page_path(name: str, base: str = "index.html") -> str:
+    """Output page of a profile: index.html -> index-alice.html"""
+    root, ext = os.path.splitext(base)
+    return f"{root}-{name}{ext}"
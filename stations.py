@@ -0,0 +1,34 @@
+"""
+Positions of the configured stations, for distance queries (commute_index.py).
+
+The table lives in station_codes.json, keyed by normalized station name.
+"""
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from models import normalize_station
+
+logger = logging.getLogger(__name__)
+
+STATION_CODES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_codes.json")
+
+
+@lru_cache(maxsize=1)
+def load_table(path: str = STATION_CODES_PATH) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load station codes: {e}")
+        return {"stations": {}}
+
+
+def station_location(name: str) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a station from the table, None if it isn't there or has no position."""
+    entry = load_table()["stations"].get(normalize_station(name))
+    if not entry or entry.get("lat") is None or entry.get("lng") is None:
+        return None
+    return entry["lat"], entry["lng"]
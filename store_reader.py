@@ -0,0 +1,115 @@
+"""
+Store schema and a pandas-free reader for properties.csv.
+
+CSVManager (pandas) owns writing and merging. Read-only callers (--show, the web app)
+use read_properties(), which returns the same records as
+CSVManager.get_all_properties() without the cost of importing pandas.
+With STORAGE_BACKEND=arrow it memory-maps properties.arrow instead, when that is at
+least as new as the CSV and pyarrow is installed, and reads only the wanted columns.
+"""
+import csv
+import os
+from typing import Any, Dict, List, Optional
+
+import config
+
+# Column order of the stored CSV
+STORE_COLUMNS = [
+    "status", "title", "total_price", "price", "admin_fee",
+    "layout", "area", "nearest_station", "walk_minutes", "walking_distance_actual", "address", "access", "url", "last_updated", "source", "cluster",
+    "station_walks", "lat", "lng", "building_age", "floor", "deposit", "key_money", "orientation"
+]
+# Explicit dtypes so the store never falls back to object columns and pandas type inference
+CATEGORY_COLUMNS = ["status", "layout", "nearest_station", "source", "orientation"]
+FLOAT_COLUMNS = ["total_price", "price", "admin_fee", "area", "walking_distance_actual", "lat", "lng",
+                 "deposit", "key_money"]
+INT_COLUMNS = ["walk_minutes", "building_age", "floor"]
+# float32 keeps ~7 significant digits; prices (万円) and areas need far fewer
+FLOAT_DECIMALS = 4
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return round(float(value), FLOAT_DECIMALS)
+    except ValueError:
+        return None
+
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(round(float(value)))
+    except ValueError:
+        return None
+
+
+def _read_arrow(path: str, wanted: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """Records from the Arrow copy of the store, or None if there is no fresh one (or no pyarrow)."""
+    arrow_path = os.path.splitext(path)[0] + ".arrow"
+    if (config.STORAGE_BACKEND != "arrow" or not os.path.exists(arrow_path)
+            or os.path.getmtime(arrow_path) < os.path.getmtime(path)):
+        return None
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+    except ImportError:
+        return None
+
+    with pa.memory_map(arrow_path, "r") as source:
+        table = ipc.open_file(source).read_all()
+        table = table.select([name for name in wanted if name in table.column_names])
+        rows = table.to_pylist()
+    floats, ints = set(FLOAT_COLUMNS), set(INT_COLUMNS)
+    records = []
+    for row in rows:
+        record = {}
+        for name in wanted:
+            value = row.get(name)
+            # Same values as a CSV round trip: "" reads as missing, floats are rounded
+            if value is None or value == "":
+                record[name] = None
+            elif name in floats:
+                record[name] = round(float(value), FLOAT_DECIMALS)
+            elif name in ints:
+                record[name] = int(value)
+            else:
+                record[name] = value
+        records.append(record)
+    return records
+
+
+def read_properties(path: str, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Stored properties as dicts in storage order, typed like the store
+    (floats, ints, None for missing). Pass columns to keep only those fields (plus url).
+    """
+    if not os.path.exists(path):
+        return []
+    records = _read_arrow(path, [name for name in STORE_COLUMNS if columns is None or name in columns or name == "url"])
+    if records is not None:
+        return records
+    # utf-8-sig: the CSV is written with a BOM for Excel
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return []
+        # Columns missing from an older file read as None, as in CSVManager
+        positions = {name: i for i, name in enumerate(header)}
+        wanted = [(positions.get(name), name) for name in STORE_COLUMNS
+                  if columns is None or name in columns or name == "url"]
+        converters = {name: _to_float for name in FLOAT_COLUMNS}
+        converters.update({name: _to_int for name in INT_COLUMNS})
+
+        records = []
+        for row in reader:
+            record = {}
+            for i, name in wanted:
+                value = row[i] if i is not None and i < len(row) else ""
+                if value == "":
+                    record[name] = None
+                elif name in converters:
+                    record[name] = converters[name](value)
+                else:
+                    record[name] = value
+            records.append(record)
+        return records
@@ -0,0 +1,232 @@
+"""
+Inverted bigram index for free-text search over title, address, access and layout.
+
+Text is NFKC-normalized (full/half-width folded), lowercased and stripped of spaces,
+then split into overlapping character bigrams ("門前仲町" -> 門前, 前仲, 仲町) per field.
+A query term matches the documents holding all of its bigrams, found by intersecting
+the posting lists (smallest first) instead of scanning every row. Bigrams can match
+out of order, so callers that have the text verify the candidates with a substring test.
+
+CSVManager.flush() rebuilds the index next to the store (properties.index.json).
+Posting lists are stored as gaps between sorted document ids to keep the file small.
+"""
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+FIELDS = ("title", "address", "access", "layout")
+INDEX_VERSION = 2
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: Any) -> str:
+    if not isinstance(text, str):
+        return ""
+    return _SPACES.sub("", unicodedata.normalize("NFKC", text)).lower()
+
+
+def bigrams(text: str) -> Set[str]:
+    """Bigrams of normalized text; a single character is its own gram."""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def query_terms(query: str) -> List[str]:
+    """Whitespace-separated terms (full-width spaces included), each normalized."""
+    return [t for t in (normalize(part) for part in unicodedata.normalize("NFKC", query or "").split()) if t]
+
+
+def index_path(store_path: str) -> str:
+    return os.path.splitext(store_path)[0] + ".index.json"
+
+
+def encode(ids: List[int]) -> List[int]:
+    """Sorted ids -> gaps: [3, 5, 9] -> [3, 2, 4]"""
+    previous = 0
+    gaps = []
+    for i in ids:
+        gaps.append(i - previous)
+        previous = i
+    return gaps
+
+
+def decode(gaps: List[int]) -> List[int]:
+    total = 0
+    ids = []
+    for gap in gaps:
+        total += gap
+        ids.append(total)
+    return ids
+
+
+def _intersect(a: List[int], b: List[int]) -> List[int]:
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            result.append(a[i])
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class TextIndex:
+    """Documents are listings, numbered in store order; `urls[doc]` maps them back."""
+
+    def __init__(self, urls: List[str], postings: Dict[str, List[int]]):
+        self.urls = urls
+        self.postings = postings
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]]) -> "TextIndex":
+        urls = []
+        postings: Dict[str, List[int]] = {}
+        for doc, record in enumerate(records):
+            urls.append(record["url"])
+            grams = set()
+            # Per field, so no gram spans two fields
+            for field in FIELDS:
+                grams |= bigrams(normalize(record.get(field)))
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc)
+        return cls(urls, postings)
+
+    def _term_docs(self, term: str) -> List[int]:
+        if len(term) == 1:
+            # Single characters aren't indexed on their own; merge the grams that contain them
+            docs = set()
+            for gram, ids in self.postings.items():
+                if term in gram:
+                    docs.update(ids)
+            return sorted(docs)
+        lists = sorted((self.postings.get(g, []) for g in bigrams(term)), key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            if not result:
+                break
+            result = _intersect(result, ids)
+        return result
+
+    def candidates(self, query: str) -> Optional[List[int]]:
+        """Documents that may match every term of the query; None for an empty query."""
+        terms = query_terms(query)
+        if not terms:
+            return None
+        result = None
+        for term in sorted(terms, key=len, reverse=True):
+            docs = self._term_docs(term)
+            result = docs if result is None else _intersect(result, docs)
+            if not result:
+                break
+        return result
+
+    def search(self, query: str, records: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[List[str]]:
+        """
+        URLs matching every query term (None for an empty query). With records ({url: record}
+        holding the indexed fields) the candidates are verified, so bigrams matched out of
+        order don't count.
+        """
+        docs = self.candidates(query)
+        if docs is None:
+            return None
+        urls = [self.urls[d] for d in docs]
+        if records is None:
+            return urls
+        terms = query_terms(query)
+        matched = []
+        for url in urls:
+            record = records.get(url)
+            if record is None:
+                continue
+            texts = [normalize(record.get(field)) for field in FIELDS]
+            if all(any(term in text for text in texts) for term in terms):
+                matched.append(url)
+        return matched
+
+    def remap(self, order: Dict[str, int]) -> Dict[str, List[int]]:
+        """
+        Gap-encoded postings over other document numbers ({url: number}, e.g. rooms in
+        page order), for shipping to the page. Listings not in `order` are dropped.
+        """
+        renumbered = [order.get(url) for url in self.urls]
+        compact = {}
+        for gram, ids in self.postings.items():
+            docs = sorted({renumbered[d] for d in ids if renumbered[d] is not None})
+            if docs:
+                compact[gram] = encode(docs)
+        return compact
+
+    def save(self, path: str):
+        data = {
+            "version": INDEX_VERSION,
+            "urls": self.urls,
+            "postings": {gram: encode(ids) for gram, ids in self.postings.items()},
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TextIndex"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["urls"], {gram: decode(gaps) for gram, gaps in data["postings"].items()})
+
+
+def page_postings(index: "TextIndex", groups: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Numbers the rooms of the page's building groups in order (room["doc"]) and returns the
+    index's postings over those numbers. A merged room answers for every copy in its sources.
+    """
+    order = {}
+    doc = 0
+    for group in groups:
+        for room in group["rooms"]:
+            room["doc"] = doc
+            for source in room.get("sources") or [room]:
+                order[source["url"]] = doc
+            doc += 1
+    return index.remap(order)
+
+
+def page_texts(groups: List[Dict[str, Any]], records: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Per room number (after page_postings), the normalized texts of its copies ({url: record}
+    holding the indexed fields), one field per line, so the page can verify its candidates.
+    """
+    texts = []
+    for group in groups:
+        for room in group["rooms"]:
+            record_texts = []
+            for source in room.get("sources") or [room]:
+                record = records.get(source["url"]) or {}
+                record_texts.extend(normalize(record.get(field)) for field in FIELDS)
+            texts.append("\n".join(t for t in record_texts if t))
+    return texts
+
+
+def load_or_build(store_path: str) -> "TextIndex":
+    """The saved index if it is at least as new as the store, else one built from the CSV."""
+    path = index_path(store_path)
+    if os.path.exists(path) and (not os.path.exists(store_path)
+                                 or os.path.getmtime(path) >= os.path.getmtime(store_path)):
+        index = TextIndex.load(path)
+        if index is not None:
+            return index
+    # Plain csv reader: no pandas for read-only callers
+    from store_reader import read_properties
+    return TextIndex.build(read_properties(store_path, columns=list(FIELDS)))